@@ -16,12 +16,29 @@ Environment Variables:
     - GOOGLE_APPLICATION_CREDENTIALS: Path to the GCP service account key file.
     - PROJECT_ID: GCP project ID.
     - DATASET_ID: BigQuery dataset ID.
+    - BQ_CACHE_DIR (optional): Directory for the on-disk Parquet result cache, shared
+      across processes and restarts. Disabled when unset.
+    - BQ_CACHE_TTL (optional): Age in seconds after which on-disk entries are refreshed.
+      Entries never expire when unset, so clear the directory after reloading the tables.
 """
 
+import hashlib
 import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import google.auth
 from dotenv import load_dotenv
+from google.auth.transport.requests import AuthorizedSession
 from google.cloud import bigquery
-from google.cloud.bigquery.table import RowIterator
+from google.cloud import bigquery_storage
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv(
@@ -31,6 +48,63 @@ os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv(
 project_id = os.getenv("PROJECT_ID")
 dataset_id = os.getenv("DATASET_ID")
 
+# Keep-alive connections held for concurrent queries from the shared client
+HTTP_POOL_SIZE = 32
+
+# Only plain queries are answered from the result cache; anything else (DDL/DML,
+# scripts, CALL, EXECUTE IMMEDIATE, ...) always executes
+_CACHEABLE_KEYWORDS = ("select", "with")
+# Whitespace and comments (--, #, /* */) before the first keyword of a statement
+_LEADING_COMMENTS_RE = re.compile(r"(?:\s+|--[^\n]*|#[^\n]*|/\*.*?\*/)*", re.DOTALL)
+# String literals and quoted identifiers (kept verbatim), or a run of whitespace
+_SQL_TOKEN_RE = re.compile(
+    r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`)|\s+""", re.DOTALL
+)
+
+
+@lru_cache(maxsize=None)
+def _bq_client(project_id):
+    """Return the process-wide BigQuery client for a project, creating it on first use."""
+    credentials, _ = google.auth.default(scopes=bigquery.Client.SCOPE)
+    # Pooled keep-alive session sized for concurrent sessions (requests defaults to 10)
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    return bigquery.Client(project=project_id, credentials=credentials, _http=session)
+
+
+@lru_cache(maxsize=1)
+def _bqstorage_client():
+    """Return the process-wide BigQuery Storage read client, creating it on first use."""
+    return bigquery_storage.BigQueryReadClient()
+
+
+def arrow_to_dataframe(table, fill_numeric_nulls=False, self_destruct=False):
+    """
+    Convert an Arrow query result to a pandas DataFrame.
+
+    Args:
+        table (pa.Table): The Arrow table returned by BigQuery.
+        fill_numeric_nulls (bool, optional): Replace nulls in numeric columns with 0 using
+            Arrow compute kernels, so integer columns stay integers instead of becoming
+            float64 with NaN during conversion.
+        self_destruct (bool, optional): Release Arrow buffers while converting to halve
+            peak memory. Only safe when the table is not used afterwards.
+
+    Returns:
+        pd.DataFrame: The converted DataFrame.
+    """
+    if fill_numeric_nulls:
+        for i, field in enumerate(table.schema):
+            column = table.column(i)
+            if column.null_count and (
+                pa.types.is_integer(field.type)
+                or pa.types.is_floating(field.type)
+                or pa.types.is_decimal(field.type)
+            ):
+                table = table.set_column(i, field, pc.fill_null(column, 0))
+    return table.to_pandas(split_blocks=True, self_destruct=self_destruct)
+
 
 class BigQueryManager:
     """
@@ -40,32 +114,168 @@ class BigQueryManager:
     Attributes:
         project_id (str): The GCP project ID.
         dataset_id (str): The BigQuery dataset ID.
-        client (bigquery.Client): An instance of the BigQuery client.
+        client (bigquery.Client): The BigQuery client shared by all managers of the project.
 
     Methods:
-        execute_query(query: str, destination_table: str = None):
+        execute_query(query: str, destination_table: str = None, priority: str = "INTERACTIVE"):
             Executes the provided SQL query and returns results
             as a DataFrame if no destination table is specified.
+
+    Read-only query results are cached (LRU, keyed on the normalized SQL text)
+    as Arrow tables fetched over the BigQuery Storage API, so a repeated query
+    never hits BigQuery again. With `cache_dir` set, results are also written as
+    Parquet files named by the SHA-1 of the normalized SQL, so they survive restarts.
     """
 
-    def __init__(self, project_id, dataset_id):
+    CACHE_SIZE = 128
+
+    def __init__(self, project_id, dataset_id, cache_dir=None, cache_ttl=None):
         """
         Initializes the BigQueryManager with project and dataset IDs.
 
         Args:
             project_id (str): The GCP project ID.
             dataset_id (str): The BigQuery dataset ID.
+            cache_dir (str, optional): Directory for the on-disk Parquet result cache.
+            cache_ttl (float, optional): Seconds before a cached result (in memory or on
+                disk) is stale.
         """
 
-        self.client = bigquery.Client()
         self.project_id = project_id
         self.dataset_id = dataset_id
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self._result_cache = OrderedDict()
+        # The manager is shared by all Streamlit sessions (threads) of the process
+        self._cache_lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def client(self):
+        """Shared BigQuery client for the project, created on first use."""
+        return _bq_client(self.project_id)
 
-    def execute_query(self, query, destination_table=None):
+    @property
+    def bqstorage_client(self):
+        """Shared BigQuery Storage read client used for Arrow downloads."""
+        return _bqstorage_client()
+
+    @staticmethod
+    def normalize_query(query):
+        """
+        Collapse whitespace so equivalent SQL texts share a cache entry.
+
+        Quoted literals and identifiers are left untouched ('New  York' stays distinct
+        from 'New York'), and case is preserved because literals are case-sensitive.
+        """
+        return _SQL_TOKEN_RE.sub(
+            lambda match: match.group(1) or " ", query
+        ).strip()
+
+    @staticmethod
+    def is_cacheable(query):
+        """
+        Whether the query is a single read-only SELECT/WITH statement.
+
+        Leading comments are skipped before the keyword is checked, and any `;` outside
+        quoted literals other than a trailing one marks a multi-statement script.
+        """
+        body = query[_LEADING_COMMENTS_RE.match(query).end():]
+        keyword = re.match(r"[A-Za-z]+", body)
+        if not keyword or keyword.group().lower() not in _CACHEABLE_KEYWORDS:
+            return False
+        unquoted = _SQL_TOKEN_RE.sub(lambda match: "''" if match.group(1) else " ", body)
+        return ";" not in unquoted.rstrip().rstrip(";")
+
+    def _cache_path(self, cache_key):
+        """Path of the Parquet file caching the result of a normalized query."""
+        digest = hashlib.sha1(cache_key.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.parquet")
+
+    def _is_fresh(self, path):
+        """Whether an on-disk cache entry exists and is younger than `cache_ttl`."""
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            return False
+        return self.cache_ttl is None or age < self.cache_ttl
+
+    def _run_cached(self, cache_key, query, job_config):
+        """Return the Arrow result for a read-only query, executing it on a cache miss."""
+        # Memory entries are (fetched_at, table) and expire under the same TTL as the files
+        with self._cache_lock:
+            entry = self._result_cache.get(cache_key)
+            if entry is not None:
+                fetched_at, table = entry
+                if self.cache_ttl is None or time.time() - fetched_at < self.cache_ttl:
+                    self._result_cache.move_to_end(cache_key)
+                    return table
+                del self._result_cache[cache_key]
+
+        path = self._cache_path(cache_key) if self.cache_dir else None
+        if path and self._is_fresh(path):
+            table = pq.read_table(path)
+            # Age the entry from when BigQuery returned it, not from when it was read back
+            fetched_at = os.path.getmtime(path)
+        else:
+            fetched_at = time.time()
+            # jobs.query returns small results inline, skipping the job polling round-trips
+            result = self.client.query_and_wait(query, job_config=job_config)
+            table = result.to_arrow(bqstorage_client=self.bqstorage_client)
+            if path:
+                # Write to a unique temp file, then rename, so concurrent readers never
+                # see a partial file and concurrent writers (threads too) never share one
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+                os.close(fd)
+                try:
+                    pq.write_table(table, tmp_path)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+
+        with self._cache_lock:
+            self._result_cache[cache_key] = (fetched_at, table)
+            self._result_cache.move_to_end(cache_key)
+            if len(self._result_cache) > self.CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+        return table
+
+    def execute_query(
+        self,
+        query,
+        destination_table=None,
+        priority="INTERACTIVE",
+        fill_numeric_nulls=False,
+    ):
         """
         Run a query. Optionally save the results to a table or return the result as a DataFrame.
+
+        SELECT queries without a destination table are served from the result cache
+        when possible; DDL/DML statements and table writes always execute.
+
+        Args:
+            query (str): The SQL query to execute.
+            destination_table (str, optional): Table to write the results to.
+            priority (str, optional): "INTERACTIVE" (default) for user-facing queries, or
+                "BATCH" for jobs that can wait for free slots, e.g. ETL writes.
+            fill_numeric_nulls (bool, optional): Zero-fill numeric nulls in Arrow before
+                converting the result to pandas.
         """
+        if priority not in ("INTERACTIVE", "BATCH"):
+            raise ValueError(f"Unknown query priority: {priority}")
+
         job_config = bigquery.QueryJobConfig()
+        if priority == "BATCH":
+            job_config.priority = bigquery.QueryPriority.BATCH
+
+        if not destination_table and self.is_cacheable(query):
+            normalized = self.normalize_query(query)
+            # Convert on every call so callers never mutate the cached result
+            return arrow_to_dataframe(
+                self._run_cached(normalized, query, job_config), fill_numeric_nulls
+            )
 
         # Handle destination table for non-DDL queries
         if destination_table and not query.strip().lower().startswith(
@@ -76,11 +286,15 @@ class BigQueryManager:
             job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
 
         query_job = self.client.query(query, job_config=job_config)
-        result: RowIterator = query_job.result()  # Wait for the query to complete
+        result = query_job.result()  # Wait for the query to complete
 
         # Return DataFrame if no destination_table is provided
         if not destination_table:
-            return result.to_dataframe()
+            return arrow_to_dataframe(
+                result.to_arrow(bqstorage_client=self.bqstorage_client),
+                fill_numeric_nulls,
+                self_destruct=True,
+            )
 
 
 # Usage
@@ -0,0 +1,76 @@
+"""
+Cache Utilities
+
+Helpers shared by the result and response caches.
+
+Classes:
+    - EmbeddingCache: Persistent SQLite store of query embeddings keyed by text hash.
+
+Functions:
+    - dataset_fingerprint: Computes a content hash of a DataFrame for cache keys and
+      change detection.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+
+def dataset_fingerprint(data):
+    """
+    Computes a stable fingerprint of a DataFrame's columns and values.
+
+    Args:
+        data (pd.DataFrame): The DataFrame to fingerprint.
+
+    Returns:
+        str: A hex digest that changes whenever the column names or any value changes.
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\x1f".join(map(str, data.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of embedding vectors in a single SQLite file.
+
+    Keys are the SHA-256 of the model name and the text, so vectors from different
+    embedding models never mix. Vectors are stored as raw float32 bytes, so a cached
+    vector is identical to the one the API returned. The connection is shared by all
+    threads of the process behind a lock; SQLite itself serializes writers across
+    processes, so several workers can share one file.
+    """
+
+    def __init__(self, path, model):
+        self.model = model
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vec BLOB)"
+            )
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model}\0{text}".encode()).digest()
+
+    def get(self, text):
+        """Return the cached vector for the text, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vec FROM embeddings WHERE key = ?", (self._key(text),)
+            ).fetchone()
+        return np.frombuffer(row[0], dtype=np.float32).tolist() if row else None
+
+    def put(self, text, vector):
+        """Store the vector for the text, replacing any previous entry."""
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+                (self._key(text), blob),
+            )
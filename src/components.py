@@ -6,15 +6,43 @@ including a generative AI model, a vector database, and a BigQuery manager.
 
 Components Initialized:
     - ChatGoogleGenerativeAI: Provides interaction with Google's Gemini model.
-    - Chroma: Vector store for document embedding and retrieval.
+    - Chroma / FAISS: Vector store for document embedding and retrieval.
     - BigQueryManager: Handles interaction with Google BigQuery.
 
 Environment Variables:
     - PROJECT_ID: The Google Cloud project ID.
     - DATASET_ID: The BigQuery dataset ID.
     - GEMINI_API_KEY: API key for accessing the Gemini AI services.
+    - BQ_CACHE_DIR (optional): Directory for the on-disk BigQuery result cache.
+    - BQ_CACHE_TTL (optional): Seconds before on-disk BigQuery results are refreshed.
+    - RESPONSE_CACHE_DIR (optional): Directory persisting the LLM response cache; kept
+      in memory when unset.
+    - LLM_MAX_RETRIES (optional): Retries with exponential backoff on Gemini rate-limit
+      and server errors. Defaults to 4.
+    - LLM_TIMEOUT (optional): Per-request Gemini timeout in seconds. Defaults to 60.
+    - GEMINI_EMBED_RPM (optional): Embedding requests per minute shared by the process.
+    - EMBEDDINGS_BACKEND (optional): "gemini" (default) or "local". The local backend runs
+      `LOCAL_EMBEDDINGS_MODEL` in process with no network round trip per query; it needs
+      the optional sentence-transformers package, and the schema index must be rebuilt
+      with `python -m src.embeddings` after switching.
+    - LOCAL_EMBEDDINGS_MODEL (optional): Sentence-transformers model for the local backend.
+    - EMBED_CACHE_PATH (optional): SQLite file persisting query embeddings across restarts.
+    - VECTOR_STORE_BACKEND (optional): "chroma" (default) or "faiss". The FAISS index is
+      loaded from `FAISS_INDEX_DIR`, as written by `src/embeddings.py`.
+    - SCHEMA_FILE (optional): Schema description file. Defaults to data/demographics_Schema.txt.
+    - SCHEMA_INLINE_MAX_BYTES (optional): Largest schema sent whole with every SQL
+      request instead of being retrieved per query; 0 always retrieves. Defaults to 32000.
+    - CHROMA_HOST / CHROMA_PORT (optional): Address of a standalone Chroma server
+      (`chroma run --path ./chroma_langchain_db --port 8000`). When set, the app connects
+      over HTTP instead of opening the persistent store in-process.
 
 Functions:
+    - get_llm(), get_embeddings(), get_vector_store(), get_bq_manager(): Cached factories
+      that build each heavy component once per process, on first use.
+    - embeddings_id(): Identifier of the configured embedding model.
+    - get_response_cache(): Cached factory for the semantic LLM response cache.
+    - get_sql_cache(): Cached factory for the in-memory, exact-match cache of generated SQL.
+    - get_full_schema(): The whole schema text when it is small enough to inline, else None.
     - initialize_components(): Initializes and returns the LLM, vector store, and BigQuery manager.
 
 Example Usage:
@@ -24,47 +52,205 @@ Example Usage:
     ```
 """
 
+import asyncio
 import os
+from functools import lru_cache
+import chromadb
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_chroma import Chroma
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores import FAISS
 from src.big_query_manager import BigQueryManager
+from src.semantic_cache import SemanticCache
+from src.throttled_embeddings import ThrottledGoogleGenerativeAIEmbeddings
 
+LLM_MAX_RETRIES = 4
+LLM_TIMEOUT = 60
+CHROMA_PORT = 8000
+CHROMA_COLLECTION = "example_collection"
+CHROMA_PERSIST_DIR = "./chroma_langchain_db"
+FAISS_INDEX_DIR = "./faiss_schema"
+SCHEMA_FILE = "data/demographics_Schema.txt"
+GEMINI_EMBEDDINGS_MODEL = "models/embedding-001"
+LOCAL_EMBEDDINGS_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SCHEMA_INLINE_MAX_BYTES = 32_000
 
-async def initialize_components():
-    """
-    Initializes the necessary components for the application.
-    Returns:
-        llm: ChatGoogleGenerativeAI instance.
-        vector_store: Chroma vector store instance.
-        bq_manager: BigQueryManager instance.
-    """
-    # Load environment variables
-    load_dotenv()
+# Read .env once at import rather than on every factory call
+load_dotenv()
 
-    # BigQuery configuration
-    project_id = os.getenv("PROJECT_ID")
-    dataset_id = os.getenv("DATASET_ID")
-    bq_manager = BigQueryManager(project_id=project_id, dataset_id=dataset_id)
 
-    # Gemini API Key
+def _gemini_api_key():
+    """Return the Gemini API key from the environment, failing fast if it is missing."""
     gemini_api_key = os.getenv("GEMINI_API_KEY")
     if not gemini_api_key:
         raise ValueError("GEMINI_API_KEY is not set. Please check your .env file.")
+    return gemini_api_key
 
-    # Initialize LLM
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro", api_key=gemini_api_key)
 
-    # Initialize vector store
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=gemini_api_key,
-        task_type="retrieval_document",
+@lru_cache(maxsize=1)
+def get_bq_manager():
+    """Return the process-wide BigQueryManager."""
+    # BigQuery configuration
+    project_id = os.getenv("PROJECT_ID")
+    dataset_id = os.getenv("DATASET_ID")
+    cache_ttl = os.getenv("BQ_CACHE_TTL")
+    return BigQueryManager(
+        project_id=project_id,
+        dataset_id=dataset_id,
+        cache_dir=os.getenv("BQ_CACHE_DIR"),
+        cache_ttl=float(cache_ttl) if cache_ttl else None,
     )
-    vector_store = Chroma(
-        collection_name="example_collection",
-        embedding_function=embeddings,
-        persist_directory="./chroma_langchain_db",
+
+
+@lru_cache(maxsize=1)
+def get_llm():
+    """Return the process-wide Gemini chat model."""
+    # The client retries ResourceExhausted/ServiceUnavailable with backoff
+    return ChatGoogleGenerativeAI(
+        model="gemini-1.5-pro",
+        api_key=_gemini_api_key(),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", LLM_MAX_RETRIES)),
+        timeout=float(os.getenv("LLM_TIMEOUT", LLM_TIMEOUT)),
+    )
+
+
+def _embeddings_backend():
+    return os.getenv("EMBEDDINGS_BACKEND", "gemini").lower()
+
+
+def embeddings_id():
+    """
+    Return an identifier of the configured embedding model, so that indexes and caches
+    built with one model are never searched with vectors from another.
+    """
+    if _embeddings_backend() == "local":
+        return "local:" + os.getenv("LOCAL_EMBEDDINGS_MODEL", LOCAL_EMBEDDINGS_MODEL)
+    return "gemini:" + GEMINI_EMBEDDINGS_MODEL
+
+
+def _cache_collection(name):
+    """Return the cache collection name for the configured embedding backend."""
+    backend = _embeddings_backend()
+    # Vectors of other models have another dimension, so they get their own collection
+    return name if backend == "gemini" else f"{name}_{backend}"
+
+
+@lru_cache(maxsize=1)
+def get_embeddings():
+    """
+    Return the process-wide embeddings client: the rate-limited Gemini client, or a
+    local sentence-transformers model with `EMBEDDINGS_BACKEND=local`.
+    """
+    backend = _embeddings_backend()
+    if backend == "local":
+        # Normalized, like Gemini's, so inner-product search and cache thresholds still hold
+        return HuggingFaceEmbeddings(
+            model_name=os.getenv("LOCAL_EMBEDDINGS_MODEL", LOCAL_EMBEDDINGS_MODEL),
+            encode_kwargs={"normalize_embeddings": True},
+        )
+    if backend == "gemini":
+        return ThrottledGoogleGenerativeAIEmbeddings(
+            model=GEMINI_EMBEDDINGS_MODEL,
+            google_api_key=_gemini_api_key(),
+            task_type="retrieval_document",
+        )
+    raise ValueError(f"Unknown EMBEDDINGS_BACKEND: {backend}")
+
+
+@lru_cache(maxsize=None)
+def get_vector_store(
+    collection_name=CHROMA_COLLECTION, persist_directory=CHROMA_PERSIST_DIR
+):
+    """
+    Return the process-wide schema vector store.
+
+    Args:
+        collection_name (str, optional): Chroma collection to open.
+        persist_directory (str, optional): Directory of the local Chroma store.
+
+    Returns:
+        Chroma or FAISS vector store instance, depending on `VECTOR_STORE_BACKEND`.
+    """
+    embeddings = get_embeddings()
+    backend = os.getenv("VECTOR_STORE_BACKEND", "chroma").lower()
+    if backend == "faiss":
+        # The index is produced locally by src/embeddings.py, so unpickling it is safe
+        return FAISS.load_local(
+            FAISS_INDEX_DIR, embeddings, allow_dangerous_deserialization=True
+        )
+    if backend == "chroma" and os.getenv("CHROMA_HOST"):
+        # Shared Chroma server: SQLite/HNSW state lives outside the app process
+        client = chromadb.HttpClient(
+            host=os.getenv("CHROMA_HOST"),
+            port=int(os.getenv("CHROMA_PORT", CHROMA_PORT)),
+        )
+        return Chroma(
+            client=client,
+            collection_name=collection_name,
+            embedding_function=embeddings,
+        )
+    if backend == "chroma":
+        return Chroma(
+            collection_name=collection_name,
+            embedding_function=embeddings,
+            persist_directory=persist_directory,
+        )
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}")
+
+
+@lru_cache(maxsize=1)
+def get_response_cache():
+    """Return the process-wide semantic cache for data-summary LLM responses."""
+    return SemanticCache(
+        get_embeddings(),
+        collection_name=_cache_collection("Response_Cache_Collection"),
+        persist_directory=os.getenv("RESPONSE_CACHE_DIR"),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_sql_cache():
+    """
+    Return the process-wide, in-memory cache for generated SQL responses.
+
+    Only exact repeats of a question hit: similar questions often differ in a literal
+    (a state, a "top N") that changes the SQL. It is not persisted, so a re-indexed
+    schema takes effect on the next restart.
+    """
+    return SemanticCache(None, semantic=False)
+
+
+@lru_cache(maxsize=1)
+def get_full_schema():
+    """
+    Return the whole schema text if it fits in `SCHEMA_INLINE_MAX_BYTES`, otherwise None.
+
+    A schema this small is cheaper to send with every request than to retrieve per
+    query, and its constant text keeps the prompt prefix cacheable.
+    """
+    max_bytes = int(os.getenv("SCHEMA_INLINE_MAX_BYTES", SCHEMA_INLINE_MAX_BYTES))
+    try:
+        with open(os.getenv("SCHEMA_FILE", SCHEMA_FILE), "r") as f:
+            schema = f.read().strip()
+    except OSError:
+        return None
+    return schema if 0 < len(schema.encode()) <= max_bytes else None
+
+
+async def initialize_components():
+    """
+    Initializes the necessary components for the application.
+    Returns:
+        llm: ChatGoogleGenerativeAI instance.
+        vector_store: Chroma or FAISS vector store instance.
+        bq_manager: BigQueryManager instance.
+    """
+    # The constructors are independent and blocking, so build them concurrently
+    llm, vector_store, bq_manager = await asyncio.gather(
+        asyncio.to_thread(get_llm),
+        asyncio.to_thread(get_vector_store),
+        asyncio.to_thread(get_bq_manager),
     )
 
     return llm, vector_store, bq_manager
@@ -6,33 +6,37 @@ generating insights based on user queries, and handling responses
 from a language model (LLM). The key tasks of this model include
 querying and processing data from a BigQuery source, cleaning and
 transforming the data, and summarizing it based on user input. 
-Additionally, the model is capable of generating Python code 
-(e.g., for visualizations), executing it safely, and returning 
-the resulting charts, if applicable.
+Additionally, the model is capable of generating Vega-Lite chart
+specifications, which are parsed as JSON (never executed) and bound
+to the dataset, returning the resulting charts, if applicable.
 
 Functions:
 - `get_data`: Retrieves data from BigQuery using a provided query manager and query string.
 - `preprocess_data`: Cleans and preprocesses data by filling missing values and removing empty rows.
 - `save_json`: Saves data in JSON format to a specified file.
 - `get_head`: Returns the first few rows of the data in JSON format.
+- `numeric_summary`: Returns min/max/mean/std of the numeric columns in JSON format.
 - `short_data`: Processes smaller datasets by summarizing them
 based on user input and interacting with a language model.
 - `process_llm_response`: Processes the response from the LLM,
-extracting any embedded Python code, executing it to generate charts,
+extracting any embedded Vega-Lite spec, building the chart from it,
 and cleaning the response of file references (e.g., PNG, HTML).
 - `data_handle`: Decides whether to process a dataset as large or
 short and handles the response accordingly, including chart generation if needed.
 
 Dependencies:
 - pandas: Used for data manipulation.
-- altair: Used for chart generation, if specified by the Python code in the LLM response.
+- altair: Used to build charts from the Vega-Lite spec in the LLM response.
 - re: Used for regular expression matching and cleaning content.
 - logging: Used for logging the operations and any errors during processing.
+- asyncio: The LLM calls and other blocking steps run in worker threads and are awaited;
+  the shared LLM client is called with `invoke`, since its async transport is bound to
+  one event loop and Streamlit uses a new loop per rerun.
 
 Logging:
 - The module logs key operations and any errors encountered during
-data processing, querying, and code execution. Errors related to
-code execution or chart generation are also logged with critical termination.
+data processing, querying, and chart generation. Errors related to
+invalid chart specs are also logged with critical termination.
 
 Usage:
 - This model is designed to be used in data analysis applications
@@ -42,17 +46,119 @@ generating visualizations, and cleaning up model responses.
 Example:
     - Retrieve data from BigQuery, preprocess it, and generate a
     summarized response based on a user's query, optionally
-    including a chart if the response includes Python code for visualizations.
+    including a chart if the response includes a Vega-Lite chart spec.
 """
 
+import asyncio
+from decimal import Decimal
+import numpy as np
+import orjson
 import pandas as pd
 import altair as alt
-import regex as re
+import re
+from google.api_core.exceptions import GoogleAPIError
 from src.logger import setup_logger
+from src.cache_utils import dataset_fingerprint
+from langchain_core.messages import SystemMessage, HumanMessage
+from src.system_prompt import (
+    SHORT_DATA_SYSTEM_PROMPT,
+    SHORT_DATA_PROMPT,
+    LARGE_DATA_SYSTEM_PROMPT,
+    LARGE_DATA_PROMPT,
+)
 
 # Get the configured logger
 logger = setup_logger()
 
+# The static instructions and examples are built once and sent as the system message;
+# only the dataset and the user's query travel in the per-request human message.
+SHORT_DATA_SYSTEM_MESSAGE = SystemMessage(content=SHORT_DATA_SYSTEM_PROMPT)
+LARGE_DATA_SYSTEM_MESSAGE = SystemMessage(content=LARGE_DATA_SYSTEM_PROMPT)
+
+# Rows encoded per chunk when streaming a dataset to disk (`save_json`)
+SAVE_JSON_CHUNK_ROWS = 10_000
+# Datasets up to this many rows are sent inline (`short_data`), larger ones as a preview
+SHORT_DATA_MAX_ROWS = 100
+# Upper bound on the serialized dataset embedded in the `short_data` prompt
+MAX_PROMPT_BYTES = 200_000
+# Columns shown in the `large_data` preview; numeric statistics still cover all columns
+PREVIEW_MAX_COLUMNS = 20
+
+# Patterns used to extract the chart spec and strip code and file references from the LLM response
+# Fences are matched on line boundaries (indentation allowed, as in the prompt examples)
+CHART_SPEC_RE = re.compile(
+    r"^[ \t]*```vega-lite[ \t]*\n(.*?)^[ \t]*```", re.DOTALL | re.MULTILINE
+)
+# Everything stripped from the response, as one alternation so the text is scanned once:
+# vega-lite/python blocks (across lines), other inline code spans, file references, labels
+CLEANUP_RE = re.compile(
+    r"(?s:```(?:vega-lite|python).*?```)"
+    r"|```.*?```"
+    r"|\b\w+\.(?:png|html|json)\b"
+    r"|(?:Python Code|Chart Spec):\s*"
+)
+# Queries asking for a listing, whose answer does not depend on repeated rows
+LIST_INTENT_RE = re.compile(r"\b(?:list|distinct|unique)\b", re.IGNORECASE)
+# Queries asking for a visualization, which always go through the LLM
+CHART_INTENT_RE = re.compile(r"\b(?:bar|chart|plot|graph|visuali[sz]e)", re.IGNORECASE)
+# Results up to this size are answered directly, without an LLM call (`format_trivial`)
+TRIVIAL_MAX_ROWS = 3
+TRIVIAL_MAX_COLUMNS = 2
+
+
+def _json_default(obj):
+    """Serialize values orjson does not handle natively (e.g. BigQuery NUMERIC decimals)."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return str(obj)
+
+
+def to_records(data):
+    """
+    Converts a DataFrame to a list of records holding plain JSON types (e.g. timestamps
+    as ISO strings, decimals as floats), as sent to the LLM and bound to charts.
+    """
+    # Round-trip through orjson so the values are plain JSON types
+    return orjson.loads(
+        orjson.dumps(
+            data.to_dict(orient="records"),
+            default=_json_default,
+            option=orjson.OPT_SERIALIZE_NUMPY,
+        )
+    )
+
+
+# Vega-Lite composition keys and the Altair class that loads each kind of top-level spec
+COMPOSITE_CHARTS = (
+    ("layer", alt.LayerChart),
+    ("hconcat", alt.HConcatChart),
+    ("vconcat", alt.VConcatChart),
+    ("concat", alt.ConcatChart),
+)
+
+
+def build_chart(spec, data):
+    """
+    Builds an Altair chart from an LLM-generated Vega-Lite spec, bound to the dataset.
+
+    Args:
+        spec (dict): The Vega-Lite specification; any "data" property is ignored.
+        data (pd.DataFrame): The dataset to chart.
+
+    Returns:
+        alt.TopLevelMixin: The chart object.
+    """
+
+    records = to_records(data)
+    # Bind the dataset before loading: single-view specs do not validate without "data"
+    spec = {key: value for key, value in spec.items() if key != "data"}
+    spec["data"] = {"values": records}
+    chart_class = next(
+        (cls for key, cls in COMPOSITE_CHARTS if key in spec), alt.Chart
+    )
+    return chart_class.from_dict(spec)
+
+
 def refine_response(response):
     """
     Refines the input response string by performing the following operations:
@@ -70,20 +176,23 @@ def refine_response(response):
 
     Logs:
         - Logs an info message indicating the start of the refining process.
-        - Logs an error message if an exception occurs during the process.
     """
 
-    try:
-        logger.info("Refining Resonse...")
-        # Remove the 'sql' tag if it exists at the start of the response
-        response = re.sub(r"^sql\s*", "", response)
-
-        # Remove triple backticks or single backticks at both ends
-        response = re.sub(r"^```sql(.*)```$", r"\1", response, flags=re.DOTALL)
-        response = re.sub(r"^```(.*)```$", r"\1", response, flags=re.DOTALL)
-        response = re.sub(r"^`(.*)`$", r"\1", response, flags=re.DOTALL)
-    except:
-        logger.error("Error in refine_response.")
+    logger.info("Refining Resonse...")
+    response = response.strip()
+    # Remove the 'sql' tag if it exists at the start of the response
+    if response[:3].lower() == "sql":
+        response = response[3:].lstrip()
+
+    # Remove triple backticks (with an optional 'sql' language tag) or single backticks
+    if response.startswith("```"):
+        end = response.rfind("```")
+        if end > 3:
+            response = response[3:end]
+            if response[:3].lower() == "sql":
+                response = response[3:]
+    elif len(response) >= 2 and response[0] == "`" and response[-1] == "`":
+        response = response[1:-1]
     # Strip any leading or trailing whitespace
     return response.strip()
 
@@ -97,7 +206,8 @@ def get_data(bq_manager, reg):
         reg (str): The BigQuery query to execute.
 
     Returns:
-        pd.DataFrame: The data retrieved from BigQuery, or None if an error occurs.
+        pd.DataFrame: The data retrieved from BigQuery, or None if the query fails
+        (a BigQuery API error or an invalid query); other errors propagate.
 
     Logs:
         - Logs an info message indicating that a BigQuery query is being executed.
@@ -109,20 +219,24 @@ def get_data(bq_manager, reg):
     try:
         # Execute the BigQuery query
         logger.info("Hitting BigQuery...")
-        data = bq_manager.execute_query(reg)
+        # Numeric nulls are zero-filled here, in Arrow; preprocess_data never refills them
+        data = bq_manager.execute_query(reg, fill_numeric_nulls=True)
         return data
-    except Exception as e:
+    except (GoogleAPIError, ValueError) as e:
         logger.error(f"SQL Query Problem: {e}")
-        logger.critical("TERMINATED")
     return None
 
 
 def preprocess_data(data: pd.DataFrame):
     """
     Preprocesses the given data by:
-    1. Filling missing values with 0.
-    2. Removing rows where all values are 0.
-    3. Resetting the index after removal of rows.
+    1. Removing rows where all values are 0 or missing.
+    2. Resetting the index after removal of rows.
+    3. Filling missing values with 0 in the non-numeric columns that contain any.
+       Numeric nulls are zero-filled in Arrow by `get_data`, before conversion.
+
+    Frames returned by this function are flagged in `attrs`, so preprocessing them
+    again (e.g. when `short_data` hands off to `large_data`) returns them unchanged.
 
     Args:
         data (pd.DataFrame): The input DataFrame to preprocess.
@@ -134,15 +248,32 @@ def preprocess_data(data: pd.DataFrame):
         - Logs an info message indicating that the data preprocessing has started.
     """
 
+    # Frames derived from an already preprocessed frame carry the flag in `attrs`
+    if data.attrs.get("preprocessed"):
+        return data
+
     logger.info("Preporcessing Data...")
-    data.fillna(0, inplace=True)
-    data = data[(data != 0).any(axis=1)].reset_index(drop=True)
+    # One pass per column finds the rows with any non-null, non-zero value (i.e.
+    # non-zero after filling) and the non-numeric columns that still hold nulls.
+    keep = np.zeros(len(data), dtype=bool)
+    null_columns = []
+    for name, column in data.items():
+        is_null = column.isna().to_numpy()
+        if is_null.any() and not pd.api.types.is_numeric_dtype(column):
+            null_columns.append(name)
+        keep |= (column.to_numpy() != 0) & ~is_null
+    # Filter first, so only the kept rows of the null columns are filled
+    data = data.loc[keep].reset_index(drop=True)
+    if null_columns:
+        data[null_columns] = data[null_columns].fillna(0)
+    data.attrs["preprocessed"] = True
     return data
 
 
 def save_json(data, filename="data.json"):
     """
-    Saves the given data to a JSON file.
+    Saves the given data to a JSON file as a list of records, serialized with orjson
+    rather than `DataFrame.to_json`, which is much slower for large results.
 
     Args:
         data (pd.DataFrame or dict): The data to save.
@@ -156,43 +287,152 @@ def save_json(data, filename="data.json"):
     """
 
     logger.info("Saving to Json...")
-    data.to_json(filename, orient="records", indent=4)
+    if not isinstance(data, pd.DataFrame):
+        with open(filename, "wb") as f:
+            f.write(orjson.dumps(data, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY))
+        return filename
+
+    # Encode SAVE_JSON_CHUNK_ROWS records at a time so peak memory does not grow
+    # with the dataset; each chunk's array brackets are dropped and rejoined.
+    with open(filename, "wb") as f:
+        f.write(b"[")
+        for start in range(0, len(data), SAVE_JSON_CHUNK_ROWS):
+            chunk = data.iloc[start : start + SAVE_JSON_CHUNK_ROWS]
+            encoded = orjson.dumps(
+                chunk.to_dict(orient="records"),
+                default=_json_default,
+                option=orjson.OPT_SERIALIZE_NUMPY,
+            )
+            if start:
+                f.write(b",")
+            f.write(encoded[1:-1])
+        f.write(b"]")
     return filename
 
 
+def to_split_json(data):
+    """
+    Serializes a DataFrame to split-orient JSON (`{"columns": [...], "data": [[...], ...]}`)
+    with orjson, which is several times faster than `DataFrame.to_json` for prompt payloads.
+
+    Args:
+        data (pd.DataFrame): The DataFrame to serialize.
+
+    Returns:
+        str: The split-orient JSON string.
+    """
+
+    payload = data.to_dict(orient="split", index=False)
+    return orjson.dumps(
+        payload, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY
+    ).decode()
+
+
+def numeric_summary(data):
+    """
+    Computes min, max, mean and standard deviation of every numeric column as JSON.
+
+    The numeric columns are stacked into one float array and each statistic is a
+    single vectorized NumPy reduction over it, rather than one pandas call per
+    column and statistic.
+
+    Args:
+        data (pd.DataFrame): The DataFrame to summarize.
+
+    Returns:
+        str: JSON object mapping each numeric column to `[min, max, mean, std]`.
+    """
+
+    numeric = data.select_dtypes(include="number")
+    if numeric.empty:
+        return "{}"
+    values = numeric.to_numpy(dtype=np.float64)
+    stats = np.column_stack(
+        (
+            values.min(axis=0),
+            values.max(axis=0),
+            values.mean(axis=0),
+            values.std(axis=0),
+        )
+    ).round(4)
+    return orjson.dumps(
+        dict(zip(map(str, numeric.columns), stats.tolist()))
+    ).decode()
+
+
 def get_head(data, rows=10):
     """
     Fetches the first few rows of the given data and returns them as a JSON string.
 
+    The rows are serialized with `orient="split"` so column names are emitted once
+    instead of being repeated for every row of the prompt payload. At most
+    PREVIEW_MAX_COLUMNS columns are included, so wide results keep the prompt bounded.
+
     Args:
         data (pd.DataFrame): The DataFrame from which to fetch the first rows.
         rows (int, optional): The number of rows to return. Defaults to 10.
 
     Returns:
-        str: The first few rows of the data in JSON format.
+        str: The first few rows of the data in split JSON format
+        (`{"columns": [...], "data": [[...], ...]}`).
 
     Logs:
         - Logs an info message indicating that the head of the data is being fetched.
     """
 
     logger.info("Fetching Head...")
-    return data.head(rows).to_json(orient="records", indent=4)
+    return to_split_json(data.iloc[:rows, :PREVIEW_MAX_COLUMNS])
+
+
+async def summarize(llm, system_message, user_prompt, user_input, data, cache=None):
+    """
+    Invokes the LLM for a data summary, going through the response cache if one is given.
 
+    Args:
+        llm (object): The language model.
+        system_message (SystemMessage): The static instructions for the summary.
+        user_prompt (str): The per-request prompt with the dataset and the user's query.
+        user_input (str): The user's query, used as the cache key.
+        data (pd.DataFrame): The dataset sent to the LLM, used to scope cache entries.
+        cache (SemanticCache, optional): Response cache; the LLM is always called if None.
 
-def short_data(data: pd.DataFrame, user_input, llm):
+    Returns:
+        str: The LLM response text.
+    """
+
+    fingerprint = dataset_fingerprint(data) if cache is not None else None
+    if cache is not None:
+        # Cache lookups embed the query synchronously, so keep them off the event loop
+        response = await asyncio.to_thread(cache.lookup, user_input, fingerprint)
+        if response is not None:
+            return response
+
+    result = await asyncio.to_thread(
+        llm.invoke, [system_message, HumanMessage(content=user_prompt)]
+    )
+    response = result.content.strip()
+
+    if cache is not None:
+        await asyncio.to_thread(cache.store, user_input, fingerprint, response)
+    return response
+
+
+async def short_data(data: pd.DataFrame, user_input, llm, cache=None):
     """
     Summarizes the provided dataset based on the user's query using a language model.
+    Datasets whose JSON exceeds MAX_PROMPT_BYTES are handed to `large_data` instead.
 
     Args:
         data (pd.DataFrame): The input dataset to be summarized.
         user_input (str): The user's query that will guide the summarization.
         llm (object): The language model used to generate the response
         based on the dataset and user query.
+        cache (SemanticCache, optional): Response cache consulted before calling the LLM.
 
     Returns:
         tuple: A tuple containing:
             - A string with the summary of the dataset relevant to the user query.
-            - A JSON string representation of the preprocessed dataset.
+            - The preprocessed dataset (pd.DataFrame).
 
     Logs:
         - Logs an info message indicating that the `short_data` function is being executed.
@@ -205,248 +445,28 @@ def short_data(data: pd.DataFrame, user_input, llm):
 
     logger.info("Fucntion short_data.")
     preprocessed_data = preprocess_data(data)
-    data_json = preprocessed_data.to_json(orient="records", lines=False, indent=4)
-
-    system_prompt = f"""
-    You are an expert data analysis assistant tasked with analyzing the dataset provided in JSON format and summarizing it based on the user's query. When responding to user queries, please provide a clear and concise summary of the relevant data. Include necessary details to make the response informative, but avoid unnecessary context about the dataset itself (such as dataset preprocessing or filtering). For example, if the query asks for students registered in a course, the response should directly focus on the result (e.g., the list of student names) with a brief, informative sentence. Do not mention dataset characteristics unless directly requested by the user.
-
-    ### Instructions:
-    1. The dataset you receive has already been preprocessed to directly align with the user's query, so it contains only the relevant information.
-    2. Your job is to:
-    - Directly address the user's query using the provided dataset.
-    - Provide insights, trends, or patterns based on the data.
-    - If the dataset has already been filtered or processed, acknowledge that and focus only on summarizing it in response to the query.
-    3. If the dataset does not contain enough information to fully answer the user's query, then you have to respond on the provided data as the provided data is the only relevent data that user asked for. and don't mention the limitation and suggest how the query could be modified for more complete results.
-    4. If the user requests a graph or visualization, create an appropriate graph (e.g., bar chart, line graph, pie chart) based on the query and the data. Ensure the graph visually represents the information in a clear and understandable way. Provide the graph as part of the response.
-    5. For the Graph, you have to write the code, run it in your environment and save the graph and the show the the saved graph to user.
-
-    ### Examples:
-    **Example 1: Find the total population in the dataset.**
-    Dataset: [1000000]
-    *System Hint*: The dataset already provides the total population, so there is no need to calculate or process it further. Just provide the number directly.
-    Response: "The total population is 1,000,000."
-
-    **Example 2: List the counties where the unemployment rate is greater than 10%.**
-    Dataset:
-    'County': ['Los Angeles', 'Cook', 'Harris', 'Maricopa', 'San Diego', 'Orange', 'Miami-Dade']
-    *System Hint*: The dataset only includes counties where the unemployment rate exceeds 10%. The data has already been filtered, so there is no need to check the unemployment rate further. Just list the counties.
-    Response: "The counties with an unemployment rate greater than 10% are: Los Angeles, Cook, Harris, Maricopa, San Diego, Orange, Miami-Dade."
-
-    **Example 3: Create a bar chart showing the average income per capita for different states.**
-    Dataset: 
-    'State': ['California', 'Texas', 'Florida'], IncomePerCap: [40000, 35000, 30000]
-    *System Hint*: The dataset provides the average income per capita for each state. Use this data to create a bar chart visualization.
-    Response: "The income per capita values are as follows:
-        California: $40,000
-        Texas: $35,000
-        Florida: $30,000
-    The  California has the highest average income per capita among the three states, followed by Texas, and then Florida with the lowest average income per capita. Here is the bar chart showing the average income per capita for different states.
-    Python Code:
-    import pandas as pd
-    import altair as alt
-    # Make dataframe with columns: `State` and `IncomePerCap` using the data given.
-        df = pd.DataFrame({{'State': ['California', 'Texas', 'Florida'], 
-        'IncomePerCap': [40000, 35000, 30000]}})
-    # Create a bar chart
-    chart = alt.Chart(df).mark_bar().encode(
-        x='State',
-        y='IncomePerCap',
-        tooltip=['State', 'IncomePerCap']
-    ).properties(
-        title='Average Income per Capita by State'
-    ).interactive()
-    # Save the chart
-    chart.save('average_income_per_capita_by_state_bar_chart.json')"
-
-    **Example 4: Calculate the percentage of people working
-    from home in each state and create a bar chart of the result.
-    Dataset:
-    [{{"State":"Arizona","AvgWorkFromHomePercentage":6.1744554455}},
-    {{"State":"California","AvgWorkFromHomePercentage":5.7201201201}},
-    {{"State":"Colorado","AvgWorkFromHomePercentage":7.4054971706}},
-    {{"State":"Michigan","AvgWorkFromHomePercentage":3.8448489261}},
-    {{"State":"Minnesota","AvgWorkFromHomePercentage":5.5103603604}},
-    {{"State":"Montana","AvgWorkFromHomePercentage":7.873605948}},
-    {{"State":"Nebraska","AvgWorkFromHomePercentage":4.9155009452}},
-    {{"State":"North Carolina","AvgWorkFromHomePercentage":5.0084870849}},
-    {{"State":"Utah","AvgWorkFromHomePercentage":5.8878424658}},
-    {{"State":"Wisconsin","AvgWorkFromHomePercentage":4.3570812365}},
-    {{"State":"Alabama","AvgWorkFromHomePercentage":2.8529361702}},
-    {{"State":"Alaska","AvgWorkFromHomePercentage":5.4102409639}},
-    {{"State":"Arkansas","AvgWorkFromHomePercentage":3.2213138686}},
-    {{"State":"Connecticut","AvgWorkFromHomePercentage":4.8723095526}},
-    {{"State":"Delaware","AvgWorkFromHomePercentage":4.7831775701}},
-    {{"State":"Florida","AvgWorkFromHomePercentage":6.1060009602}},
-    {{"State":"Georgia","AvgWorkFromHomePercentage":4.7996927803}},
-    {{"State":"Hawaii","AvgWorkFromHomePercentage":4.980952381}},
-    {{"State":"Illinois","AvgWorkFromHomePercentage":4.3616051364}},
-    {{"State":"Indiana","AvgWorkFromHomePercentage":3.3805444887}},
-    {{"State":"Iowa","AvgWorkFromHomePercentage":4.7150668287}},
-    {{"State":"Kansas","AvgWorkFromHomePercentage":4.2932806324}},
-    {{"State":"Kentucky","AvgWorkFromHomePercentage":3.3713898917}},
-    {{"State":"Louisiana","AvgWorkFromHomePercentage":2.8303730018}},
-    {{"State":"Maine","AvgWorkFromHomePercentage":5.7005698006}},
-    {{"State":"Maryland","AvgWorkFromHomePercentage":4.461299639}},
-    {{"State":"Massachusetts","AvgWorkFromHomePercentage":4.9449453552}},
-    {{"State":"Mississippi","AvgWorkFromHomePercentage":2.0687975647}},
-    {{"State":"Missouri","AvgWorkFromHomePercentage":4.5036717063}},
-    {{"State":"Nevada","AvgWorkFromHomePercentage":4.0932153392}},
-    {{"State":"New Hampshire","AvgWorkFromHomePercentage":6.1482876712}},
-    {{"State":"New Jersey","AvgWorkFromHomePercentage":4.1807518797}},
-    {{"State":"New Mexico","AvgWorkFromHomePercentage":5.2076305221}},
-    {{"State":"New York","AvgWorkFromHomePercentage":4.0684275691}},
-    {{"State":"Ohio","AvgWorkFromHomePercentage":3.5995915589}},
-    {{"State":"Oklahoma","AvgWorkFromHomePercentage":3.7250717703}},
-    {{"State":"Oregon","AvgWorkFromHomePercentage":6.8875151515}},
-    {{"State":"Pennsylvania","AvgWorkFromHomePercentage":4.2565842978}},
-    {{"State":"Rhode Island","AvgWorkFromHomePercentage":3.945}},
-    {{"State":"South Carolina","AvgWorkFromHomePercentage":3.7717171717}},
-    {{"State":"Tennessee","AvgWorkFromHomePercentage":3.9021636241}},
-    {{"State":"Texas","AvgWorkFromHomePercentage":4.2865620214}},
-    {{"State":"Vermont","AvgWorkFromHomePercentage":7.4601092896}},
-    {{"State":"Virginia","AvgWorkFromHomePercentage":4.6888}},
-    {{"State":"Washington","AvgWorkFromHomePercentage":5.8076177285}},
-    {{"State":"Wyoming","AvgWorkFromHomePercentage":4.9648854962}},
-    {{"State":"Puerto Rico","AvgWorkFromHomePercentage":2.2007900677}},
-    {{"State":"Idaho","AvgWorkFromHomePercentage":6.0047138047}},
-    {{"State":"District of Columbia","AvgWorkFromHomePercentage":5.282122905}},
-    {{"State":"North Dakota","AvgWorkFromHomePercentage":6.0541463415}},
-    {{"State":"South Dakota","AvgWorkFromHomePercentage":6.8779279279}},
-    {{"State":"West Virginia","AvgWorkFromHomePercentage":3.1214876033}}]
-    *System Hint*: The dataset provides the average workathome percentage of the states, use this data to create the bar graph.
-    Response:
-    "The states with the highest average work-from-home percentages are Montana (7.87%), Vermont (7.46%), and Colorado (7.41%), while the states with the lowest percentages are Mississippi (2.07%), Puerto Rico (2.20%), and Louisiana (2.83%).
-    The average work-from-home percentages for different states are as follows:
-    Montana: 7.87%
-    Vermont: 7.46%
-    Colorado: 7.41%
-    South Dakota: 6.88%
-    Oregon: 6.89%
-    Arizona: 6.17%
-    New Hampshire: 6.15%
-    Florida: 6.11%
-    North Dakota: 6.05%
-    Idaho: 6.00%
-    Washington: 5.81%
-    Utah: 5.89%
-    Maine: 5.70%
-    California: 5.72%
-    Minnesota: 5.51%
-    Alaska: 5.41%
-    New Mexico: 5.21%
-    District of Columbia: 5.28%
-    North Carolina: 5.01%
-    Hawaii: 4.98%
-    Wisconsin: 4.36%
-    Illinois: 4.36%
-    Texas: 4.29%
-    Kansas: 4.29%
-    Missouri: 4.50%
-    Maryland: 4.46%
-    Pennsylvania: 4.26%
-    Nevada: 4.09%
-    New Jersey: 4.18%
-    New York: 4.07%
-    Rhode Island: 3.95%
-    Tennessee: 3.90%
-    South Carolina: 3.77%
-    Oklahoma: 3.73%
-    Ohio: 3.60%
-    Michigan: 3.84%
-    Indiana: 3.38%
-    Kentucky: 3.37%
-    Arkansas: 3.22%
-    West Virginia: 3.12%
-    Alabama: 2.85%
-    Louisiana: 2.83%
-    Puerto Rico: 2.20%
-    Mississippi: 2.07%
-
-    Python Code: 
-    import pandas as pd
-    import altair as alt
-    # Define the data using a dictionary
-    data = [
-        {{"State": "Arizona", "AvgWorkFromHomePercentage": 6.1744554455}},
-        {{"State": "California", "AvgWorkFromHomePercentage": 5.7201201201}},
-        {{"State": "Colorado", "AvgWorkFromHomePercentage": 7.4054971706}},
-        {{"State": "Michigan", "AvgWorkFromHomePercentage": 3.8448489261}},
-        {{"State": "Minnesota", "AvgWorkFromHomePercentage": 5.5103603604}},
-        {{"State": "Montana", "AvgWorkFromHomePercentage": 7.873605948}},
-        {{"State": "Nebraska", "AvgWorkFromHomePercentage": 4.9155009452}},
-        {{"State": "North Carolina", "AvgWorkFromHomePercentage": 5.0084870849}},
-        {{"State": "Utah", "AvgWorkFromHomePercentage": 5.8878424658}},
-        {{"State": "Wisconsin", "AvgWorkFromHomePercentage": 4.3570812365}},
-        {{"State": "Alabama", "AvgWorkFromHomePercentage": 2.8529361702}},
-        {{"State": "Alaska", "AvgWorkFromHomePercentage": 5.4102409639}},
-        {{"State": "Arkansas", "AvgWorkFromHomePercentage": 3.2213138686}},
-        {{"State": "Connecticut", "AvgWorkFromHomePercentage": 4.8723095526}},
-        {{"State": "Delaware", "AvgWorkFromHomePercentage": 4.7831775701}},
-        {{"State": "Florida", "AvgWorkFromHomePercentage": 6.1060009602}},
-        {{"State": "Georgia", "AvgWorkFromHomePercentage": 4.7996927803}},
-        {{"State": "Hawaii", "AvgWorkFromHomePercentage": 4.980952381}},
-        {{"State": "Illinois", "AvgWorkFromHomePercentage": 4.3616051364}},
-        {{"State": "Indiana", "AvgWorkFromHomePercentage": 3.3805444887}},
-        {{"State": "Iowa", "AvgWorkFromHomePercentage": 4.7150668287}},
-        {{"State": "Kansas", "AvgWorkFromHomePercentage": 4.2932806324}},
-        {{"State": "Kentucky", "AvgWorkFromHomePercentage": 3.3713898917}},
-        {{"State": "Louisiana", "AvgWorkFromHomePercentage": 2.8303730018}},
-        {{"State": "Maine", "AvgWorkFromHomePercentage": 5.7005698006}},
-        {{"State": "Maryland", "AvgWorkFromHomePercentage": 4.461299639}},
-        {{"State": "Massachusetts", "AvgWorkFromHomePercentage": 4.9449453552}},
-        {{"State": "Mississippi", "AvgWorkFromHomePercentage": 2.0687975647}},
-        {{"State": "Missouri", "AvgWorkFromHomePercentage": 4.5036717063}},
-        {{"State": "Nevada", "AvgWorkFromHomePercentage": 4.0932153392}},
-        {{"State": "New Hampshire", "AvgWorkFromHomePercentage": 6.1482876712}},
-        {{"State": "New Jersey", "AvgWorkFromHomePercentage": 4.1807518797}},
-        {{"State": "New Mexico", "AvgWorkFromHomePercentage": 5.2076305221}},
-        {{"State": "New York", "AvgWorkFromHomePercentage": 4.0684275691}},
-        {{"State": "Ohio", "AvgWorkFromHomePercentage": 3.5995915589}},
-        {{"State": "Oklahoma", "AvgWorkFromHomePercentage": 3.7250717703}},
-        {{"State": "Oregon", "AvgWorkFromHomePercentage": 6.8875151515}},
-        {{"State": "Pennsylvania", "AvgWorkFromHomePercentage": 4.2565842978}},
-        {{"State": "Rhode Island", "AvgWorkFromHomePercentage": 3.945}},
-        {{"State": "South Carolina", "AvgWorkFromHomePercentage": 3.7717171717}},
-        {{"State": "Tennessee", "AvgWorkFromHomePercentage": 3.9021636241}},
-        {{"State": "Texas", "AvgWorkFromHomePercentage": 4.2865620214}},
-        {{"State": "Vermont", "AvgWorkFromHomePercentage": 7.4601092896}},
-        {{"State": "Virginia", "AvgWorkFromHomePercentage": 4.6888}},
-        {{"State": "Washington", "AvgWorkFromHomePercentage": 5.8076177285}},
-        {{"State": "Wyoming", "AvgWorkFromHomePercentage": 4.9648854962}},
-        {{"State": "Puerto Rico", "AvgWorkFromHomePercentage": 2.2007900677}},
-        {{"State": "Idaho", "AvgWorkFromHomePercentage": 6.0047138047}},
-        {{"State": "District of Columbia", "AvgWorkFromHomePercentage": 5.282122905}},
-        {{"State": "North Dakota", "AvgWorkFromHomePercentage": 6.0541463415}},
-        {{"State": "South Dakota", "AvgWorkFromHomePercentage": 6.8779279279}},
-        {{"State": "West Virginia", "AvgWorkFromHomePercentage": 3.1214876033}},
-    ]
-    # Create dataframe
-    df = pd.DataFrame(data)
-    # Create bar plot
-    chart = (
-        alt.Chart(df).mark_bar().encode(
-            x=alt.X('State', axis=alt.Axis(title='State', labelAngle=-45)),
-            y=alt.Y('AvgWorkFromHomePercentage', axis=alt.Axis(title='Average Work From Home Percentage')),
-            tooltip=['State', 'AvgWorkFromHomePercentage']
-        ).properties(
-            title='Average Work From Home Percentage by State'
-        ).interactive()
+    prompt_data = preprocessed_data
+    if LIST_INTENT_RE.search(user_input):
+        # Repeated rows add tokens but nothing to a listing; the chart keeps every row
+        prompt_data = preprocessed_data.drop_duplicates(ignore_index=True)
+    data_json = to_split_json(prompt_data)
+    if len(data_json) > MAX_PROMPT_BYTES:
+        # Too wide to inline: send a preview and full-dataset statistics instead
+        logger.info("Dataset exceeds the prompt size limit; using large_data.")
+        return await large_data(preprocessed_data, user_input, llm, cache=cache)
+
+    user_prompt = SHORT_DATA_PROMPT.substitute(
+        data_json=data_json, user_input=user_input
     )
-    # Save chart
-    chart.save('average_work_from_home_percentage_by_state_bar_chart.json')
-
-    ### Your Task:
-    - Given the dataset: {data_json}
-    - And the user's query: {user_input}
-    Please summarize the data accordingly. If a graph is requested, generate the appropriate visualization and provide it as part of the response.
-    """
 
     # Call LLM to get a refined response based on the dataset and user query
-    result = llm.invoke(system_prompt)
-    return result.content.strip(), data_json
+    response = await summarize(
+        llm, SHORT_DATA_SYSTEM_MESSAGE, user_prompt, user_input, prompt_data, cache
+    )
+    return response, preprocessed_data
 
 
-def large_data(data: pd.DataFrame, user_input, llm, filename="data.json", rows=10):
+async def large_data(data: pd.DataFrame, user_input, llm, rows=10, cache=None):
     """
     Handle data processing and visualization based on user input
     Returns: tuple (summary_text, chart) where chart is None if no visualization was created
@@ -454,369 +474,100 @@ def large_data(data: pd.DataFrame, user_input, llm, filename="data.json", rows=1
     logger.info("Function large_data")
     # Step 1: Preprocess the data
     preprocessed_data = preprocess_data(data)
-    # Step 2: Save full preprocessed data to a JSON file
-    json_filename = save_json(preprocessed_data, filename)
-    # Step 3: Get a preview (head) of the dataset for metadata
-    data_preview = get_head(preprocessed_data, rows)
-
-    system_prompt = f"""
-    You are an expert data analysis assistant tasked with analyzing the dataset provided in JSON format and summarizing it based on the user's query. When responding to user queries, please provide a clear and concise summary of the relevant data. Include necessary details to make the response informative, but avoid unnecessary context about the dataset itself (such as dataset preprocessing or filtering). For example, if the query asks for students registered in a course, the response should directly focus on the result (e.g., the list of student names) with a brief, informative sentence. Do not mention dataset characteristics unless directly requested by the user.
-
-    ### Instructions:
-    - Instead of receiving the entire dataset, you will be provided with:
-    1. The **filename** of the saved JSON data file.
-    2. A **preview (head)** of the dataset, which contains the first few rows to help you understand the structure.
-    - Use this preview to analyze the structure and generate the necessary code to process the full dataset stored in the given file.
-    - You must analyze the data by **reading it from the provided file**, ensuring your insights are based on the complete dataset.
-    3. The dataset you receive has already been preprocessed to directly align with the user's query, so it contains only the relevant information.
-    4. Your job is to:
-    - Directly address the user's query using the provided dataset.
-    - Provide insights, trends, or patterns based on the data.
-    - If the dataset has already been filtered or processed, acknowledge that and focus only on summarizing it in response to the query.
-    5. If the dataset does not contain enough information to fully answer the user's query, then you have to respond on the provided data as the provided data is the only relevent data that user asked for. and don't mention the limitation and suggest how the query could be modified for more complete results.
-    6. If the user requests a graph or visualization, create an appropriate graph (e.g., bar chart, line graph, pie chart) based on the query and the data. Ensure the graph visually represents the information in a clear and understandable way. Provide the graph as part of the response.
-    7. For the Graph, you have to write the code, run it in your environment and save the graph and the show the the saved graph to user.
-
-    ### Your Responsibilities:
-    1. **Understanding the Dataset:**
-    - Use the head of the dataset to infer structure (columns, data types).
-    - Write appropriate code to analyze the full dataset by reading it from the provided file and Generate accurate summaries and responses based on the user's query.
-    
-    2. **Generating Insights:**
-    - Directly address the user's query by processing the data accordingly.
-    - If requested, generate visualizations using appropriate Python libraries(altair).
-    - Provide concise yet informative summaries based on the retrieved data.
-    
-    3. **Handling Missing Information:**
-    - If the provided preview doesn't contain enough information to answer the query, don't panic.
-    - The dataset you have is already filtered on the base of the user query, e.g. user query is "Visualize the racial distribution (White, Black, Asian, Hispanic) for New York." and the data you have just contain the columns of the (White, Black, Asian, Hispanic). It means it's just the data of the New York. You don't need the city column for filtering.
-
-    4. **Visualization Instructions:**
-    - When requested, generate visualization code that reads the data from the JSON file and creates appropriate graphs (bar charts, line graphs, etc.).
-    - Ensure the generated code is executable, and the chart is saved for display.
-
-    ### Examples:
-    **Example 1: Create a bar chart for the racial distribution in New York.**
-    - Filename: `data.json`
-    - Preview:
-    ```json
-
-        [{{"White":55.9,"Black":4.0,"Native":1.0,"Asian":14.9,"Pacific":0.9,"Hispanic":17.0}},
-        {{"White":95.5,"Black":0.1,"Native":0.6,"Asian":0.4,"Pacific":0.0,"Hispanic":2.2}},
-        {{"White":1.2,"Black":27.2,"Native":1.3,"Asian":0.0,"Pacific":0.0,"Hispanic":69.4}},
-        {{"White":0.7,"Black":16.1,"Native":0.0,"Asian":1.0,"Pacific":0.0,"Hispanic":78.8}},
-        {{"White":13.8,"Black":74.8,"Native":0.0,"Asian":0.4,"Pacific":0.0,"Hispanic":6.5}},
-        {{"White":71.3,"Black":0.9,"Native":0.0,"Asian":19.5,"Pacific":0.0,"Hispanic":2.8}},
-        {{"White":2.2,"Black":92.0,"Native":0.0,"Asian":0.0,"Pacific":0.0,"Hispanic":4.7}},
-        {{"White":75.2,"Black":6.1,"Native":0.0,"Asian":0.0,"Pacific":0.0,"Hispanic":18.6}},
-        {{"White":95.2,"Black":1.6,"Native":0.0,"Asian":0.3,"Pacific":0.0,"Hispanic":1.4}},
-        {{"White":8.4,"Black":82.1,"Native":0.3,"Asian":0.0,"Pacific":0.0,"Hispanic":7.3}}]
-        ```
-    *System Hint*: The dataset already provides the distribution of recial in New York, so there's no need to filter it further. Just use it to response.
-    Response: "The racial distribution across different areas of New York is as follows:
-        White Population:
-            Highest: 95.5%
-            Lowest: 0.7%
-            Observed in areas with significant variations.
-        Black Population:
-            Highest: 92.0%
-            Lowest: 0.1%
-            Some areas have a predominantly Black population, while others have minimal representation.
-        Native Population:
-            Highest: 1.3%
-            Lowest: 0.0%
-            The Native population remains relatively low across all areas.
-        Asian Population:
-            Highest: 19.5%
-            Lowest: 0.0%
-            Certain areas have a notable Asian presence, particularly up to 19.5%.
-        Pacific Population:
-            Highest: 0.9%
-            Lowest: 0.0%
-            The Pacific Islander population is minimal across the dataset.
-        Hispanic Population:
-            Highest: 78.8%
-            Lowest: 1.4%
-            Some areas show a very high concentration of Hispanic residents.
-    Here's the bar graph for visulization
-    Python Code:
-    import pandas as pd
-    import altair as alt
-
-    # Load the JSON file
-    df = pd.read_json('data.json')
-
-    # Transpose the DataFrame.
-    df = df.T
-
-    # Calculate the average of each column.
-    df_mean = pd.DataFrame(df.mean(axis=1), columns=['Mean'])
-
-    # Add a column `Race` to `df_mean`.
-    df_mean['Race'] = df_mean.index
-
-    # Create a bar plot using columns `Race` and `Mean` from `df_mean`.
-    chart = alt.Chart(df_mean).mark_bar().encode(
-        x='Race',
-        y='Mean',
-        tooltip=['Race', 'Mean']
-    ).properties(
-        title='Racial Distribution in New York'
+    # Step 2: Get a preview (head) of the dataset for metadata, and
+    # Step 3: Summarize the numeric columns so the LLM sees the whole dataset, not just the head.
+    # Both run in worker threads, so serializing a large frame does not block the event loop.
+    data_preview, data_stats = await asyncio.gather(
+        asyncio.to_thread(get_head, preprocessed_data, rows),
+        asyncio.to_thread(numeric_summary, preprocessed_data),
     )
 
-    # Save the chart
-    chart.save('racial_distribution_new_york.json')"
-
-    **Example 2: List the counties where the unemployment rate is greater than 10%.**
-    - Filename: `data.json`
-    - Preview: 
-    ```json
-        [{{"County":"Trimble County"}},{{"County":"Lea County"}},{{"County":"Walla Walla County"}},{{"County":"Modoc County"}},{{"County":"Catahoula Parish"}},{{"County":"Banks County"}},{{"County":"Stokes County"}},{{"County":"Buckingham County"}},{{"County":"Ziebach County"}},{{"County":"Gladwin County"}}]
-    ```
-    *System Hint*: The dataset only includes counties where the unemployment rate exceeds 10%. The data has already been filtered, so there is no need to check the unemployment rate further. Just list the counties.
-    Response: "The counties with an unemployment rate greater than 10% are: 
-        Trimble County
-        Lea County
-        Walla Walla County
-        Modoc County
-        Catahoula Parish
-        Banks County
-        Stokes County
-        Buckingham County
-        Ziebach County
-        Gladwin County
-    Here is a visualization representing the listed counties.
-    Python Code:
-    import pandas as pd
-    import altair as alt
-
-    # Load the JSON file
-    df = pd.read_json('data.json')
-
-    # Calculate the frequency of each county.
-    df['Frequency'] = df.groupby('County')['County'].transform('count')
-
-    # Create the bar plot.
-    chart = alt.Chart(df).mark_bar().encode(
-        x=alt.X('County', axis=alt.Axis(title='County', labelAngle=-45)),
-        y=alt.Y('Frequency', axis=alt.Axis(title='Frequency')),
-        tooltip=['County', 'Frequency']
-    ).properties(
-        title='Frequency of Counties'
+    user_prompt = LARGE_DATA_PROMPT.substitute(
+        data_preview=data_preview,
+        row_count=len(preprocessed_data),
+        data_stats=data_stats,
+        user_input=user_input,
     )
 
-    # Save the chart.
-    chart.save('frequency_of_counties.json')"
-
-    **Example 3: Create a bar chart showing the average income per capita for different states.**
-    - Filename: `data.json`
-    - Preview: 
-    ```json
-        [{{"State":"Vermont","AvgIncomePerCap":31682.6612021858}},{{"State":"Virginia","AvgIncomePerCap":36048.3336886993}},{{"State":"Washington","AvgIncomePerCap":34461.5671745153}},{{"State":"Wyoming","AvgIncomePerCap":30673.8015267176}},{{"State":"Puerto Rico","AvgIncomePerCap":12043.7898305085}},{{"State":"Idaho","AvgIncomePerCap":25361.5838926174}},{{"State":"District of Columbia","AvgIncomePerCap":49815.7486033519}},{{"State":"North Dakota","AvgIncomePerCap":33524.8634146341}},{{"State":"South Dakota","AvgIncomePerCap":28359.0045045045}},{{"State":"West Virginia","AvgIncomePerCap":24130.3719008264}}]
-    ```
-    *System Hint*: The dataset contains information about the average income per capita for various states and territories. This data can be used to analyze and compare economic conditions across different regions. Use it to create visualizations, such as bar charts, to better understand income disparities and trends across states.
-    Response: ""The average income per capita for the listed states and territories is as follows:
-        Vermont: $31,682
-        Virginia: $36,048
-        Washington: $34,461
-        Wyoming: $30,673
-        Puerto Rico: $12,043
-        Idaho: $25,361
-        District of Columbia: $49,815
-        North Dakota: $33,524
-        South Dakota: $28,359
-        West Virginia: $24,130
-    Among the listed states, the District of Columbia has the highest average income per capita at $49,815, whereas Puerto Rico has the lowest at $12,043. Most states fall within the range of $25,000 to $36,000.
-    Here is a bar chart visualization representing the average income per capita across different states for better comparison and analysis.
-    Python Code:
-    import pandas as pd
-    import altair as alt
-
-    # Load the JSON file
-    df = pd.read_json('data.json')
-
-    # Create a bar chart with `State` on the x-axis and `AvgIncomePerCap` on the y-axis.
-    chart = alt.Chart(df).mark_bar().encode(
-        x='State',
-        y='AvgIncomePerCap',
-        tooltip=['State', 'AvgIncomePerCap']
-    ).properties(
-        title='Average Income per Capita by State'
-    )
-
-    # Save the chart
-    chart.save('average_income_per_capita_by_state_bar_chart.json')"
-
-    **Example 4: Calculate the percentage of people working from home in each state and create a bar chart of the result.
-    - Filename: `data.json`
-    - Preview: 
-    ```json
-        [{{"State":"Vermont","AvgWorkFromHomePercentage":7.4601092896}},{{"State":"Virginia","AvgWorkFromHomePercentage":4.6888}},{{"State":"Washington","AvgWorkFromHomePercentage":5.8076177285}},{{"State":"Wyoming","AvgWorkFromHomePercentage":4.9648854962}},{{"State":"Puerto Rico","AvgWorkFromHomePercentage":2.2007900677}},{{"State":"Idaho","AvgWorkFromHomePercentage":6.0047138047}},{{"State":"District of Columbia","AvgWorkFromHomePercentage":5.282122905}},{{"State":"North Dakota","AvgWorkFromHomePercentage":6.0541463415}},{{"State":"South Dakota","AvgWorkFromHomePercentage":6.8779279279}},{{"State":"West Virginia","AvgWorkFromHomePercentage":3.1214876033}}]
-    ```
-    *System Hint*: The dataset provides the average workathome percentage of the states, use this data to create the bar graph.
-    Response:
-    "The states with the highest average work-from-home percentages are Montana (7.87%), Vermont (7.46%), and Colorado (7.41%), while the states with the lowest percentages are Mississippi (2.07%), Puerto Rico (2.20%), and Louisiana (2.83%).
-    The average work-from-home percentages for different states are as follows:
-    Montana: 7.87%
-    Vermont: 7.46%
-    Colorado: 7.41%
-    South Dakota: 6.88%
-    Oregon: 6.89%
-    Arizona: 6.17%
-    New Hampshire: 6.15%
-    Florida: 6.11%
-    North Dakota: 6.05%
-    Idaho: 6.00%
-    Washington: 5.81%
-    Utah: 5.89%
-    Maine: 5.70%
-    California: 5.72%
-    Minnesota: 5.51%
-    Alaska: 5.41%
-    New Mexico: 5.21%
-    District of Columbia: 5.28%
-    North Carolina: 5.01%
-    Hawaii: 4.98%
-    Wisconsin: 4.36%
-    Illinois: 4.36%
-    Texas: 4.29%
-    Kansas: 4.29%
-    Missouri: 4.50%
-    Maryland: 4.46%
-    Pennsylvania: 4.26%
-    Nevada: 4.09%
-    New Jersey: 4.18%
-    New York: 4.07%
-    Rhode Island: 3.95%
-    Tennessee: 3.90%
-    South Carolina: 3.77%
-    Oklahoma: 3.73%
-    Ohio: 3.60%
-    Michigan: 3.84%
-    Indiana: 3.38%
-    Kentucky: 3.37%
-    Arkansas: 3.22%
-    West Virginia: 3.12%
-    Alabama: 2.85%
-    Louisiana: 2.83%
-    Puerto Rico: 2.20%
-    Mississippi: 2.07%
-
-    Python Code: 
-    import pandas as pd
-    import altair as alt
-    # Load the JSON file
-    df = pd.read_json('data.json')
-    # Create bar plot
-    chart = (
-        alt.Chart(df).mark_bar().encode(
-            x=alt.X('State', axis=alt.Axis(title='State', labelAngle=-45)),
-            y=alt.Y('AvgWorkFromHomePercentage', axis=alt.Axis(title='Average Work From Home Percentage')),
-            tooltip=['State', 'AvgWorkFromHomePercentage']
-        ).properties(
-            title='Average Work From Home Percentage by State'
-        ).interactive()
-    )
-    # Save chart
-    chart.save('average_work_from_home_percentage_by_state_bar_chart.json')
-
-    ### Your Task:
-    - Given the dataset filename: {json_filename}
-    - And the preview of the dataset: {data_preview}
-    - And the user's query: {user_input}
-    Please summarize the data accordingly. If a graph is requested, generate the appropriate visualization and provide it as part of the response.
-    """
-
     # Call LLM to get a refined response based on the dataset and user query
-    result = llm.invoke(system_prompt)
-    return result.content.strip(), preprocessed_data
+    response = await summarize(
+        llm, LARGE_DATA_SYSTEM_MESSAGE, user_prompt, user_input, preprocessed_data, cache
+    )
+    return response, preprocessed_data
 
 
 def process_llm_response(response_text, data):
     """
-    Processes the response from the language model, extracting Python code, cleaning file references, and attempting to execute code for chart generation.
+    Processes the response from the language model, extracting the Vega-Lite chart spec, cleaning code and file references, and building the chart.
 
     Args:
-        response_text (str): The response from the language model containing potential Python code and other content.
-        data (pd.DataFrame): The data to be used by the Python code, if any is included in the response.
+        response_text (str): The response from the language model containing a potential chart spec and other content.
+        data (pd.DataFrame): The data to bind to the chart, if a spec is included in the response.
 
     Returns:
         tuple: A tuple containing:
             - A cleaned version of the response text, with file references and code removed.
-            - A chart object (if generated during code execution), otherwise None.
+            - A chart object (if a valid spec was found), otherwise None.
 
     Logs:
-        - Logs the process of extracting and executing Python code.
-        - Logs any error during code execution or chart generation.
+        - Logs the process of extracting the chart spec.
+        - Logs any error during chart generation.
 
     Example:
-        If the response includes Python code to generate a chart, the function executes the code and returns the chart along with a cleaned response text.
+        If the response includes a ```vega-lite block, the function builds the chart from it with the dataset bound and returns it along with a cleaned response text.
     """
 
     logger.info("Function process_llm_response")
-    # Step 2: Define patterns for code and file references (PNG, HTML)
-    code_pattern = r"```python(.*?)```"
-    nocode_pattern = r"```(.*?)```"
-    pattern = r"Python Code:\s*"
-    png_pattern = r"\b\w+\.png\b"
-    html_pattern = r"\b\w+\.html\b"
-    json_pattern = r"\b\w+\.json\b"
-
-    # Step 3: Extract the Python code from the response (if present)
-    code_match = re.search(code_pattern, response_text, re.DOTALL)
-
-    # Step 4: Clean the response by removing file references (PNG, HTML) from the text
-    response_text = re.sub(code_pattern, "", response_text, flags=re.DOTALL).strip()
-    response_text = re.sub(png_pattern, "", response_text).strip()
-    response_text = re.sub(pattern, "", response_text).strip()
-    response_text = re.sub(html_pattern, "", response_text).strip()
-    response_text = re.sub(json_pattern, "", response_text).strip()
-    response_text = re.sub(nocode_pattern, "", response_text).strip()
+    # Step 2: Extract the chart spec from the response (if present)
+    spec_match = CHART_SPEC_RE.search(response_text)
+
+    # Step 3: Clean the response by removing code and file references (PNG, HTML, JSON)
+    response_text = CLEANUP_RE.sub("", response_text).strip()
 
     # Initialize the chart variable to None
     chart = None
 
-    # Step 5: If Python code exists, try executing it safely
-    if code_match:
+    # Step 4: If a chart spec exists, parse it and build the chart; no code is executed
+    if spec_match:
         try:
-            logger.info("Python Code found in the response.")
-            # Extract the Python code from the match and clean it
-            code = code_match.group(1).strip()
-            # Define local variables for execution
-            local_vars = {
-                "pd": pd,
-                "alt": alt,
-                "data": data,
-            }  # Assuming 'data' is provided elsewhere
-            exec(code, local_vars)
-
-            # Check if a chart object was created
-            if "chart" in local_vars:
-                logger.info("Chart found in the local_vars.")
-                chart = local_vars["chart"]
-                logger.critical("TERMINATED")
-
-            # Clean the response by removing any remaining file references after code execution
-            response_text = re.sub(
-                code_pattern, "", response_text, flags=re.DOTALL
-            ).strip()
-            response_text = re.sub(png_pattern, "", response_text).strip()
-            response_text = re.sub(html_pattern, "", response_text).strip()
-            response_text = re.sub(json_pattern, "", response_text).strip()
-            response_text = re.sub(nocode_pattern, "", response_text).strip()
-            response_text = re.sub(pattern, "", response_text).strip()
-
+            logger.info("Chart spec found in the response.")
+            spec = orjson.loads(spec_match.group(1).strip())
+            chart = build_chart(spec, data)
         except Exception as e:
             logger.error("Failed to Generate Chart.")
-            # Append error message if code execution fails
+            # Append error message if the spec is invalid
             response_text += f"\nError generating visualization: {str(e)}"
-            logger.critical("TERMINATED")
 
     # Return the cleaned response text and the chart (if generated)
     return response_text, chart
 
 
-def data_handle(data, user_input, llm, filename="data.json", rows=10):
+def format_trivial(data):
+    """
+    Formats a tiny result without the LLM: one sentence for a single value, otherwise
+    one bullet per row.
+
+    Values are rendered from the same JSON records the other paths send to the LLM.
+
+    Args:
+        data (pd.DataFrame): A preprocessed result of at most TRIVIAL_MAX_ROWS x
+            TRIVIAL_MAX_COLUMNS.
+
+    Returns:
+        str: The answer text.
+    """
+
+    records = to_records(data)
+    if data.shape == (1, 1):
+        column = str(data.columns[0]).replace("_", " ")
+        return f"The {column} is {records[0][data.columns[0]]}."
+    return "\n".join(
+        "- " + ", ".join(f"{column}: {value}" for column, value in record.items())
+        for record in records
+    )
+
+
+async def data_handle(data, user_input, llm, rows=10, cache=None):
     """
     Handles the dataset based on its size, processes it using either the large or short dataset function, and then processes the language model's response.
 
@@ -824,8 +575,8 @@ def data_handle(data, user_input, llm, filename="data.json", rows=10):
         data (pd.DataFrame): The dataset to be processed.
         user_input (str): The user's query to guide data summarization.
         llm (object): The language model to summarize the dataset based on the user query.
-        filename (str, optional): The name of the file to save the data (default is "data.json").
         rows (int, optional): The number of rows to display in the case of a small dataset (default is 10).
+        cache (SemanticCache, optional): Response cache for repeated or near-duplicate queries.
 
     Returns:
         tuple: A tuple containing:
@@ -838,25 +589,36 @@ def data_handle(data, user_input, llm, filename="data.json", rows=10):
         - Logs the response from the language model and chart generation process.
 
     Example:
-        If the dataset has more than 100 rows, it is processed with the `large_data` function, otherwise, the `short_data` function is used. After processing, the cleaned response and potential chart are returned.
+        If the dataset has more than SHORT_DATA_MAX_ROWS (100) rows, it is processed with the `large_data` function, otherwise, the `short_data` function is used. Both paths return the same `(data_rows, response_text, chart)` tuple.
+        A result of at most TRIVIAL_MAX_ROWS rows and TRIVIAL_MAX_COLUMNS columns is answered directly by `format_trivial`, unless the user asks for a chart.
     """
 
     data_rows = len(data)
 
-    if data_rows > 100:
+    # Preprocessed frames are flagged, so short_data/large_data do not redo this
+    preprocessed_data = preprocess_data(data)
+    if (
+        0 < len(preprocessed_data) <= TRIVIAL_MAX_ROWS
+        and len(preprocessed_data.columns) <= TRIVIAL_MAX_COLUMNS
+        and not CHART_INTENT_RE.search(user_input)
+    ):
+        logger.info("Trivial result; answering without the LLM")
+        return data_rows, format_trivial(preprocessed_data), None
+
+    if data_rows > SHORT_DATA_MAX_ROWS:
         logger.info("Function called for large dataset")
-        response, preprocessed_data = large_data(
-            data, user_input, llm, filename="data.json", rows=10
+        response, preprocessed_data = await large_data(
+            preprocessed_data, user_input, llm, rows=rows, cache=cache
         )
-
-        response_text, chart = process_llm_response(response, preprocessed_data)
-
-        return response_text, chart
-
-    elif data_rows <= 100:
+    else:
         logger.info("Function Called for short dataset")
-        response, data_json = short_data(data, user_input, llm)
+        response, preprocessed_data = await short_data(
+            preprocessed_data, user_input, llm, cache=cache
+        )
 
-        response_text, chart = process_llm_response(response, data_json)
+    # Binding the full dataset to the chart runs in a worker thread
+    response_text, chart = await asyncio.to_thread(
+        process_llm_response, response, preprocessed_data
+    )
 
-        return data_rows, response_text, chart
+    return data_rows, response_text, chart
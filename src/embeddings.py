@@ -1,91 +1,214 @@
 """
 Schema Embedding Generation and Storage with Chroma
 
-This module processes a schema file (demographics_Schema.txt), generates embeddings 
+This module processes a schema file (data/demographics_Schema.txt), generates embeddings 
 for each table in the schema using Google Generative AI embeddings, and stores 
 these embeddings in a Chroma vector store for future retrieval and querying.
-"""
-
 
-import os
-from uuid import uuid4
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_chroma import Chroma
-from langchain.docstore.document import Document  # Import Document class
-from dotenv import load_dotenv
+Set VECTOR_STORE_BACKEND=faiss to write a FAISS inner-product index to ./faiss_schema
+instead of the Chroma collection.
 
-load_dotenv()
+The index is only rebuilt when the schema file or the embedding model changes: the
+SHA-256 of both from the last build is kept in `.schema_hash` inside the index directory.
+With a remote Chroma server (CHROMA_HOST) no hash file is kept; the incremental sync
+compares the server's table IDs directly.
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+Run from the repository root:
+    python -m src.embeddings
+"""
 
-schema_file = "demographics_Schema.txt"
 
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/embedding-001",
-    google_api_key=GEMINI_API_KEY,
-    task_type="retrieval_document",
+import hashlib
+import os
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from tenacity import retry, stop_after_attempt, wait_exponential
+from src.components import (
+    FAISS_INDEX_DIR,
+    SCHEMA_FILE,
+    embeddings_id,
+    get_embeddings,
+    get_vector_store,
+)
+from src.logger import setup_logger
+
+# Get the configured logger
+logger = setup_logger()
+
+EMBED_ATTEMPTS = 3
+CHROMA_PERSIST_DIR = "./Chroma_db"
+
+
+def iter_tables(file_path):
+    """
+    Yield each table block of the schema file, reading it line by line.
+
+    Each block starts at a line beginning with 'Table Name:' and runs up to the next
+    one, so only a single block is held in memory at a time.
+    """
+    block = None
+    with open(file_path, "r") as f:
+        for line in f:
+            if line.startswith("Table Name:"):
+                if block:
+                    yield "".join(block).strip()
+                block = [line]
+            elif block is not None:
+                block.append(line)
+    if block:
+        yield "".join(block).strip()
+
+
+@retry(
+    stop=stop_after_attempt(EMBED_ATTEMPTS),
+    wait=wait_exponential(multiplier=1, max=30),
+    reraise=True,
 )
+def _embed_batch(tables):
+    """Embed the tables in one request, retrying transient API errors (e.g. 429s) with backoff."""
+    return get_embeddings().embed_documents(tables)
 
 
 # Function to generate embeddings
 def generate_embeddings(file_path):
     try:
-        # Read the schema file
-        with open(file_path, "r") as f:
-            schema_content = f.read()
-
-        # Assuming each table starts with 'Table Name:'
-        tables = schema_content.split("Table Name:")[1:]
-        tables = [
-            f"Table Name:{table.strip()}" for table in tables
-        ]  # Re-add 'Table Name:'
-
-        # Generate embeddings for each table and store them
-        embeddings_list = []
-        for table in tables:
-            table_embedding = embeddings.embed_documents([table])[
-                0
-            ]  # Ensure we get the embedding for the table
-            embeddings_list.append({"document": table, "embedding": table_embedding})
-
-        return embeddings_list
-    except Exception as e:
-        print(f"Error generating embeddings: {e}")
-        return None
-
+        tables = list(iter_tables(file_path))
 
-# Generate embeddings for the schema
-schema_embeddings = generate_embeddings(schema_file)
+        # Embed each distinct table once, in one batched request, and map the vectors
+        # back onto the tables in their original order (templated blocks repeat)
+        unique = list(dict.fromkeys(tables))
+        vec_map = dict(zip(unique, _embed_batch(unique))) if unique else {}
+        embeddings_list = [
+            {"document": table, "embedding": vec_map[table]} for table in tables
+        ]
 
-# Print the embeddings and store them in Chroma
-if schema_embeddings:
-    # print("Schema Embeddings:")
-    # print(schema_embeddings[:500])
-
-    # Create Chroma vector store
-    vector_store = Chroma(
+        return embeddings_list
+    except Exception:
+        # Fail loudly: an index built without the schema breaks SQL generation
+        logger.exception("Error generating embeddings.")
+        raise
+
+
+def table_id(table):
+    """
+    Content-derived ID of a table block, so unchanged tables keep their ID across builds.
+    The embedding model is part of the ID, so switching models re-embeds every table.
+    """
+    return hashlib.blake2b(
+        f"{embeddings_id()}\0{table}".encode(), digest_size=16
+    ).hexdigest()
+
+
+def sync_chroma(tables):
+    """
+    Bring the Chroma schema collection in line with the given table blocks.
+
+    Tables whose content ID is already stored are left as they are, tables that no
+    longer exist are deleted, and only new or edited tables are embedded and upserted.
+    """
+    # Open the Chroma vector store through the shared, cached factory
+    vector_store = get_vector_store(
         collection_name="Demographics_Schema_Collection",
-        embedding_function=embeddings,
-        persist_directory="./Chroma_db",  # Where to save data locally, remove if not necessary
+        persist_directory=CHROMA_PERSIST_DIR,
     )
 
-    # Generate unique IDs for the documents
-    uuids = [str(uuid4()) for _ in range(len(schema_embeddings))]
-
-    # Prepare the documents as langchain Document objects
-    documents = [
-        Document(page_content=embedding_data["document"])
-        for embedding_data in schema_embeddings
-    ]
-    embeddings_list = [
-        embedding_data["embedding"] for embedding_data in schema_embeddings
-    ]
-
-    # Add each embedding to the Chroma collection using add_documents method
-    vector_store.add_documents(
-        documents=documents, embeddings=embeddings_list, ids=uuids
+    # Identical blocks share a content ID, so each is stored and embedded once
+    tables = list(dict.fromkeys(tables))
+    ids = [table_id(table) for table in tables]
+    existing = set(vector_store.get(include=[])["ids"])
+
+    stale = list(existing.difference(ids))
+    if stale and not existing.intersection(ids):
+        # Nothing to keep (e.g. another embedding model, with another dimension): start over
+        vector_store.reset_collection()
+        existing = set()
+    elif stale:
+        vector_store.delete(ids=stale)
+
+    new_ids, new_tables = [], []
+    for id_, table in zip(ids, tables):
+        if id_ not in existing:
+            new_ids.append(id_)
+            new_tables.append(table)
+    if new_tables:
+        # Upsert with the precomputed vectors; add_documents would embed the texts again
+        vector_store._collection.upsert(
+            ids=new_ids, documents=new_tables, embeddings=_embed_batch(new_tables)
+        )
+
+    logger.info(
+        f"Chroma schema index synced: {len(new_tables)} embedded, "
+        f"{len(stale)} removed, {len(tables) - len(new_tables)} unchanged."
     )
 
-    print("Embeddings have been stored in Chroma.")
-else:
-    print("Failed to generate and store schema embeddings.")
+
+def schema_hash(file_path):
+    """
+    Return the SHA-256 of the embedding model and the schema file, used to detect when
+    the index is stale.
+    """
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(embeddings_id().encode() + b"\0" + f.read()).hexdigest()
+
+
+def build_index(file_path=None):
+    """
+    Embed the schema and store it in the configured vector store, unless the stored
+    index was already built from an identical schema file. The FAISS index is rebuilt
+    in full; the Chroma collection is synced incrementally by `sync_chroma`.
+
+    `file_path` defaults to the `SCHEMA_FILE` environment variable, then to
+    `components.SCHEMA_FILE`, the same file the app inlines.
+    """
+    file_path = file_path or os.getenv("SCHEMA_FILE", SCHEMA_FILE)
+    backend = os.getenv("VECTOR_STORE_BACKEND", "chroma").lower()
+    index_dir = FAISS_INDEX_DIR if backend == "faiss" else CHROMA_PERSIST_DIR
+    # A local file cannot vouch for a remote Chroma server's contents; there the
+    # incremental sync itself is the up-to-date check
+    remote = backend == "chroma" and bool(os.getenv("CHROMA_HOST"))
+    hash_file = None if remote else os.path.join(index_dir, ".schema_hash")
+
+    try:
+        current_hash = schema_hash(file_path)
+    except OSError as e:
+        logger.error(f"Cannot read schema file: {e}")
+        return
+    if hash_file and os.path.exists(hash_file):
+        with open(hash_file, "r") as f:
+            if f.read().strip() == current_hash:
+                logger.info("Schema unchanged; the existing index is up to date.")
+                return
+
+    if backend == "faiss":
+        # Generate embeddings for the schema
+        schema_embeddings = generate_embeddings(file_path)
+        if not schema_embeddings:
+            logger.error("No tables found in the schema file; nothing was stored.")
+            return
+
+        # Gemini embeddings are unit-normalized, so inner product equals cosine similarity
+        vector_store = FAISS.from_embeddings(
+            text_embeddings=[
+                (embedding_data["document"], embedding_data["embedding"])
+                for embedding_data in schema_embeddings
+            ],
+            embedding=get_embeddings(),
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+        )
+        vector_store.save_local(FAISS_INDEX_DIR)
+
+        logger.info("Embeddings have been stored in FAISS.")
+    else:
+        tables = list(iter_tables(file_path))
+        if not tables:
+            logger.error("No tables found in the schema file; nothing was stored.")
+            return
+        sync_chroma(tables)
+
+    if hash_file:
+        with open(hash_file, "w") as f:
+            f.write(current_hash)
+
+
+if __name__ == "__main__":
+    build_index()
@@ -1,5 +1,7 @@
 import logging
 
+LOG_FORMAT = "%(levelname)s: %(message)s"
+
 # ANSI escape codes for colors
 COLOR_MAP = {
     "DEBUG": "\033[96m",  # Cyan
@@ -50,7 +52,8 @@ def setup_logger():
         1. Set the log level to `INFO`.
         2. Set the log message format to show the log level and message.
         3. Add a `StreamHandler` to print log messages to the console.
-        4. Apply a `ColorFormatter` to the log handler to colorize the log messages.
+        4. Apply a `ColorFormatter` to handlers writing to a terminal to colorize the log
+           messages; other handlers get a plain `logging.Formatter`.
 
     Returns:
         logger: The configured logger instance.
@@ -62,13 +65,18 @@ def setup_logger():
     """
     logging.basicConfig(
         level=logging.INFO,
-        format="%(levelname)s: %(message)s",
+        format=LOG_FORMAT,
         handlers=[logging.StreamHandler()],
     )
 
-    # Apply colored formatter to all handlers
+    # Apply colored formatter to handlers writing to a terminal; redirected output
+    # (files, log collectors) gets plain records without ANSI escape codes
     logger = logging.getLogger()
     for handler in logger.handlers:
-        handler.setFormatter(ColorFormatter("%(levelname)s: %(message)s"))
+        stream = getattr(handler, "stream", None)
+        if stream is not None and hasattr(stream, "isatty") and stream.isatty():
+            handler.setFormatter(ColorFormatter(LOG_FORMAT))
+        else:
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
     return logger
@@ -4,98 +4,178 @@ natural language based on schema information stored in a Chroma vector store. Th
 uses a large language model (LLM) to process the user input and interact with the schema 
 context, providing either a valid SQL query or refined natural language prompts if the 
 query cannot be processed.
+
+All LLM and vector store calls are awaited so that concurrent sessions sharing an event
+loop do not block each other. The LLM is called with the sync `invoke` in a worker thread
+rather than `ainvoke`: the client is a process-wide singleton, and its async transport
+would stay bound to the first event loop, while Streamlit runs each rerun on a new one
+(`asyncio.run`). Transient Gemini errors
+(rate limits, 5xx) are retried with exponential backoff by the LLM client itself
+(see `LLM_MAX_RETRIES` in `src.components`).
+
+With a cache (see `get_sql_cache` in `src.components`), a repeated question reuses the
+earlier response and schema context, skipping both the schema retrieval and the Gemini
+call. Only exact repeats hit: near-duplicate questions often differ in a literal
+("Texas" vs "Ohio", "top 5" vs "top 10") that changes the SQL. A schema small enough to inline (see
+`get_full_schema` in `src.components`) is sent whole, skipping retrieval entirely.
 """
 
+import asyncio
+import threading
+import orjson
+from collections import OrderedDict
+from functools import lru_cache
 from langchain_core.messages import SystemMessage, HumanMessage
-from src.system_prompt import SYSTEM_PROMPT
+from src.system_prompt import SYSTEM_PROMPT, FALLBACK_PROMPT, NO_SQL_SENTINEL
 from src.logger import setup_logger
 
 # Get the configured logger
 logger = setup_logger()
 
-
-def generate_initial_response(user_input, llm, vector_store, k):
-    """Generate the initial response from the LLM based on user input and schema context."""
+# Static part of the initial system message; only the schema context varies per call
+SYSTEM_PROMPT_PREFIX = SYSTEM_PROMPT + "\nSchema Context:\n"
+
+# Scope of the SQL cache entries; responses depend on the number of retrieved documents,
+# or on the whole schema when it is inlined
+SQL_CACHE_SCOPE = "sql:k={k}"
+SQL_CACHE_SCOPE_FULL = "sql:full"
+
+# Upper bound on the number of schema documents retrieved per query
+MAX_K = 10
+
+# LRU of retrieved schema documents keyed by (vector store, query, k). It lives for the
+# process, like the SQL cache: restart the app after re-indexing the schema.
+RETRIEVAL_CACHE_SIZE = 1024
+_retrieval_cache = OrderedDict()
+# Sessions may run on several threads (each Streamlit rerun has its own event loop)
+_retrieval_lock = threading.Lock()
+
+
+async def retrieve_schema_context(user_input, vector_store, k):
+    """
+    Retrieve the schema documents relevant to the user input from the vector store.
+
+    `k` is clamped to `[1, MAX_K]`. Results are cached per (vector store, query, k)
+    for the lifetime of the process, so repeated queries skip both the embedding call
+    and the similarity search; a re-indexed schema is picked up on restart.
+
+    Returns:
+        tuple: The page contents of the retrieved documents.
+    """
+    k = max(1, min(int(k), MAX_K))
+    key = (id(vector_store), user_input, k)
+    with _retrieval_lock:
+        documents = _retrieval_cache.get(key)
+        if documents is not None:
+            _retrieval_cache.move_to_end(key)
+            return documents
+
+    results = await vector_store.asimilarity_search(user_input, k=k)
+    documents = tuple(item.page_content for item in results)
+
+    with _retrieval_lock:
+        _retrieval_cache[key] = documents
+        _retrieval_cache.move_to_end(key)
+        if len(_retrieval_cache) > RETRIEVAL_CACHE_SIZE:
+            _retrieval_cache.popitem(last=False)
+    return documents
+
+
+def needs_fallback(response):
+    """
+    Return True if the initial response is the model's no-SQL sentinel.
+
+    The model is instructed to start such responses with `NO_SQL_SENTINEL`; leading
+    whitespace and stray backticks around it are tolerated.
+    """
+    return response.lstrip("` \n").startswith(NO_SQL_SENTINEL)
+
+
+@lru_cache(maxsize=256)
+def build_system_message(context):
+    """Return the initial SystemMessage for a schema context, reusing it for repeated contexts."""
+    return SystemMessage(content=SYSTEM_PROMPT_PREFIX + context)
+
+
+@lru_cache(maxsize=256)
+def build_human_message(user_input):
+    """Return the HumanMessage for a user query, shared by the initial and fallback calls."""
+    return HumanMessage(content=user_input)
+
+
+async def generate_initial_response(
+    user_input, llm, vector_store, k, cache=None, schema=None
+):
+    """
+    Generate the initial response from the LLM based on user input and schema context.
+
+    Returns a `(response, context)` tuple so callers can reuse the retrieved schema
+    context (e.g. for the fallback logic) without querying the vector store again.
+    With a `cache` (an exact-match SemanticCache), a repeated question returns the
+    cached pair without retrieval or an LLM call. With the full `schema` text (see `get_full_schema`), it is used as the
+    context and the vector store is not queried at all.
+    """
+    context = ""
     try:
         logger.info("Function generate_initial_response.")
-        # Retrieve relevant schema information from ChromaDB
-        results = vector_store.similarity_search(user_input, k=k)
-
-        # Flatten the list of results to extract content
-        flattened_context = [item.page_content for item in results]
+        scope = SQL_CACHE_SCOPE_FULL if schema else SQL_CACHE_SCOPE.format(k=k)
+        if cache is not None:
+            cached = cache.lookup_exact(user_input, scope)
+            if cached is not None:
+                entry = orjson.loads(cached)
+                return entry["response"], entry["context"]
+
+        if schema:
+            # The whole schema is the context
+            flattened_context = (schema,)
+        else:
+            # Retrieve relevant schema information from ChromaDB
+            flattened_context = await retrieve_schema_context(user_input, vector_store, k)
 
         # Concatenate retrieved schema context
         context = "\n".join(flattened_context)
 
         # Initial system prompt and message
-        system_message = SystemMessage(
-            content=f"{SYSTEM_PROMPT}\nSchema Context:\n{context}"
-        )
-        human_message = HumanMessage(content=user_input)
+        system_message = build_system_message(context)
+        human_message = build_human_message(user_input)
 
         # Generate initial response
-        response = llm.invoke([system_message, human_message])
+        response = await asyncio.to_thread(llm.invoke, [system_message, human_message])
 
         # Debugging output
         # print("Initial Response generated:")
         # print(response.content.strip())
         logger.info(response.content.strip())
 
-        return response.content.strip()
+        if cache is not None:
+            entry = {"response": response.content.strip(), "context": context}
+            cache.store(user_input, scope, orjson.dumps(entry).decode())
+
+        return response.content.strip(), context
     except Exception as e:
-        logger.error("Error generating response...")
-        print(f"Error generating response: {e}")
+        logger.error(f"Error generating response: {e}")
         return (
-            "An error occurred while processing your request. Please try again later."
+            "An error occurred while processing your request. Please try again later.",
+            context,
         )
 
 
-def trigger_fallback_logic(user_input, llm, context, human_message):
+async def trigger_fallback_logic(user_input, llm, context, human_message):
     """Trigger the fallback logic when the initial response cannot generate a SQL query."""
     try:
         logger.info("Fallback Logic triggered.")
         # print("Triggering fallback logic")
 
         # Fallback system prompt
-        SYSTEM_PROMPT_2 = f"""
-        You are an assistant tasked with refining natural language queries for better SQL generation. 
-
-        **IMPORTANT INSTRUCTIONS:**
-        1. **You are strictly bounded NOT to generate or include any SQL queries under any circumstances.**
-        2. Your task is to:
-        - Explain why the user's original query could not generate a valid SQL query.
-        - You are strictly bound to return at least 3 refined natural language prompts that address the issues in the original query.
-        3. Your response must strictly contain:
-        - A short explanation of why the original query failed.
-        - Refined natural language prompts, formatted as bullet points.
-        4. **Do NOT explain how to write SQL queries.**
-        5. **Do NOT mention SQL query structures, examples, or any SQL-related code in your response.**
-
-        **Here is the user's query that needs refinement:**  
-        {user_input}
-
-        **Schema Context:**  
-        {context}
-
-        **Response Format:**
-        1. **Why the Query Failed:**  
-        - [Brief explanation of failure]
-
-        2. **Refined Prompts:**  
-        - Refined Prompt 1: [First refined query]  
-        - Refined Prompt 2: [Second refined query]  
-        - Refined Prompt 3: [Third refined query]  
-
-        **Strict Reminder:**  
-        - You are strictly bound NOT to generate or include SQL queries in your response.
-        - You are strictly bound NOT to NOT discuss SQL syntax, query examples, or anything related to SQL query writing.
-        - You are strictly bound not to **Suggested SQL Query:**
-        - You are strictly bound not to return Improved SQL (based on Refined Prompt)
-        """
+        SYSTEM_PROMPT_2 = FALLBACK_PROMPT.substitute(
+            user_input=user_input, context=context
+        )
 
         # Use fallback system prompt
         refined_system_message = SystemMessage(content=SYSTEM_PROMPT_2)
-        refined_response = llm.invoke([refined_system_message, human_message])
+        refined_response = await asyncio.to_thread(
+            llm.invoke, [refined_system_message, human_message]
+        )
 
         # Debugging output
         logger.info("Improved Prompts Generated.")
@@ -103,46 +183,37 @@ def trigger_fallback_logic(user_input, llm, context, human_message):
         # print(refined_response.content.strip())
 
         # Return refined response (this means no further processing or BigQuery execution)
-        logger.critical("TERMINATED")
         return refined_response.content.strip()
 
     except Exception as e:
-        print(f"Error triggering fallback logic: {e}")
-        logger.error("Error triggering fallback logic.")
+        logger.error(f"Error triggering fallback logic: {e}")
         return "An error occurred while processing the fallback logic. Please try again later."
 
 
-def get_response(user_input, llm, vector_store, k):
+async def get_response(user_input, llm, vector_store, k, cache=None, schema=None):
     """Main function to get response and handle fallback logic if needed."""
     try:
         logger.info("Function get_response...")
         # Generate initial response
-        response = generate_initial_response(user_input, llm, vector_store, k)
+        response, context = await generate_initial_response(
+            user_input, llm, vector_store, k, cache=cache, schema=schema
+        )
 
-        if (
-            "I cannot generate a SQL query for this request based on the provided schema."
-            in response
-        ):
+        if needs_fallback(response):
             # If the response indicates fallback is needed, trigger fallback logic
             # print("Fallback triggered.")
             logger.info("Fallback triggered")
-            # Retrieve schema context from ChromaDB again to pass to the fallback logic
-            results = vector_store.similarity_search(user_input, k=k)
-            flattened_context = [item.page_content for item in results]
-            context = "\n".join(flattened_context)
+            # Reuse the schema context retrieved for the initial response
             # Call the fallback logic
-            return trigger_fallback_logic(
-                user_input, llm, context, HumanMessage(content=user_input)
+            return await trigger_fallback_logic(
+                user_input, llm, context, build_human_message(user_input)
             )
 
-        logger.critical("TERMINATED")
         # Return the initial response if successful (i.e., SQL query generation)
         return response
 
     except Exception as e:
-        print(f"Error in get_response: {e}")
-        logger.error("An error occurred while processing your request")
-        logger.critical("TERMINATED")
+        logger.error(f"An error occurred while processing your request: {e}")
         return (
             "An error occurred while processing your request. Please try again later."
         )
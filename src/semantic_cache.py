@@ -0,0 +1,157 @@
+"""
+Semantic LLM Response Cache
+
+This module provides a two-tier cache for LLM responses. Entries are scoped to a
+fingerprint (for data summaries, the dataset's), so a cached answer is only reused
+within the same scope:
+
+    1. Exact match: a dict lookup on (fingerprint, user query), then a metadata lookup in
+       the Chroma collection, which needs no embedding call.
+    2. Semantic match: the nearest previously seen query for the same fingerprint in a
+       dedicated Chroma collection, accepted when its distance is below a threshold.
+
+The raw LLM response text is cached; charts are rebuilt from it by `process_llm_response`.
+With `semantic=False` the same class backs the exact-only, in-process cache of
+generated SQL (see `get_sql_cache`).
+With a `persist_directory`, both tiers survive restarts and are shared by every process
+using the same directory.
+
+Classes:
+    - SemanticCache: Looks up and stores LLM responses by query and dataset fingerprint.
+
+Usage Example:
+    cache = SemanticCache(embeddings)
+    response = cache.lookup(user_input, fingerprint)
+    if response is None:
+        response = llm.invoke(messages).content.strip()
+        cache.store(user_input, fingerprint, response)
+"""
+
+from uuid import uuid4
+from langchain_chroma import Chroma
+from src.logger import setup_logger
+
+# Get the configured logger
+logger = setup_logger()
+
+
+class SemanticCache:
+    """
+    Two-tier (exact, then semantic) cache of LLM responses keyed by query and dataset.
+
+    Attributes:
+        max_distance (float): Largest embedding distance at which a similar query is
+            considered a hit. With unit-normalized embeddings and Chroma's default L2
+            space, 0.1 corresponds to a cosine similarity of about 0.95.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        collection_name="Response_Cache_Collection",
+        persist_directory=None,
+        max_distance=0.1,
+        semantic=True,
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            embeddings: The embeddings client used to embed user queries.
+            collection_name (str, optional): Chroma collection holding cached queries. It is
+                kept separate from the schema collection.
+            persist_directory (str, optional): Where to persist the collection; in-memory if None.
+            max_distance (float, optional): Semantic hit threshold.
+            semantic (bool, optional): If False, only exact in-process hits are served and
+                no Chroma collection is created, so `embeddings` may be None. Use this when
+                near-duplicate queries must not share a response (e.g. generated SQL).
+        """
+        self.max_distance = max_distance
+        self._exact = {}
+        self._store = None
+        if semantic:
+            self._store = Chroma(
+                collection_name=collection_name,
+                embedding_function=embeddings,
+                persist_directory=persist_directory,
+            )
+
+    def lookup(self, user_input, fingerprint, embedding=None):
+        """Return the cached response for the query on this dataset, or None on a miss."""
+        response = self.lookup_exact(user_input, fingerprint)
+        if response is not None:
+            return response
+        return self.lookup_similar(user_input, fingerprint, embedding)
+
+    def lookup_exact(self, user_input, fingerprint):
+        """Return the response cached for exactly this query, without any embedding call."""
+        response = self._exact.get((fingerprint, user_input))
+        if response is not None:
+            logger.info("Response cache hit (exact).")
+            return response
+        if self._store is None:
+            return None
+
+        try:
+            stored = self._store.get(
+                where={"$and": [{"fingerprint": fingerprint}, {"query": user_input}]},
+                limit=1,
+            )
+        except Exception as e:
+            logger.error(f"Response cache lookup failed: {e}")
+            return None
+
+        if stored["metadatas"]:
+            logger.info("Response cache hit (exact, stored).")
+            response = stored["metadatas"][0]["response"]
+            self._exact[(fingerprint, user_input)] = response
+            return response
+        return None
+
+    def lookup_similar(self, user_input, fingerprint, embedding=None):
+        """
+        Return the response cached for the nearest similar query, or None on a miss.
+
+        A precomputed query `embedding` is used as is, so a caller that needs the vector
+        anyway (e.g. for retrieval) embeds the query only once.
+        """
+        if self._store is None:
+            return None
+        try:
+            if embedding is None:
+                results = self._store.similarity_search_with_score(
+                    user_input, k=1, filter={"fingerprint": fingerprint}
+                )
+            else:
+                results = self._store.similarity_search_by_vector_with_relevance_scores(
+                    embedding, k=1, filter={"fingerprint": fingerprint}
+                )
+        except Exception as e:
+            logger.error(f"Response cache lookup failed: {e}")
+            return None
+
+        if results and results[0][1] <= self.max_distance:
+            logger.info("Response cache hit (semantic).")
+            return results[0][0].metadata["response"]
+        return None
+
+    def store(self, user_input, fingerprint, response, embedding=None):
+        """Cache the response for the query on this dataset, reusing `embedding` if given."""
+        self._exact[(fingerprint, user_input)] = response
+        if self._store is None:
+            return
+        metadata = {"fingerprint": fingerprint, "query": user_input, "response": response}
+        try:
+            if embedding is None:
+                self._store.add_texts(
+                    [user_input], metadatas=[metadata], ids=[str(uuid4())]
+                )
+            else:
+                self._store._collection.add(
+                    ids=[str(uuid4())],
+                    embeddings=[embedding],
+                    documents=[user_input],
+                    metadatas=[metadata],
+                )
+        except Exception as e:
+            logger.error(f"Response cache store failed: {e}")
@@ -0,0 +1,120 @@
+"""
+Rate-limited Gemini Embeddings
+
+This module provides a drop-in replacement for `GoogleGenerativeAIEmbeddings` whose
+API requests all pass through one process-wide rate limiter, so bursts of schema
+lookups from concurrent sessions cannot trip Gemini's per-minute embedding quota.
+
+Classes:
+    - RateLimiter: Sliding-window limiter shared across threads and event loops.
+    - ThrottledGoogleGenerativeAIEmbeddings: Embeddings client that batches documents
+      and acquires a limiter slot before every API request.
+
+Query embeddings can also be persisted in an `EmbeddingCache`, so a repeated query
+costs neither an API request nor a limiter slot, across restarts and workers.
+
+Environment Variables:
+    - GEMINI_EMBED_RPM (optional): Embedding requests allowed per minute. Defaults to 1500.
+    - EMBED_CACHE_PATH (optional): SQLite file caching query embeddings; disabled when unset.
+
+Usage Example:
+    embeddings = ThrottledGoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",
+        google_api_key=GEMINI_API_KEY,
+        task_type="retrieval_document",
+    )
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from langchain_core.runnables.config import run_in_executor
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from src.cache_utils import EmbeddingCache
+
+EMBED_RPM = 1500
+EMBED_BATCH_SIZE = 64
+
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter allowing at most `max_calls` calls per `period` seconds.
+
+    Each caller reserves the earliest free slot under a lock and then sleeps outside
+    the lock until that slot is reached, so waiting callers never block each other.
+    """
+
+    def __init__(self, max_calls, period=60.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._slots = deque(maxlen=max_calls)
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Reserve the next slot and return how many seconds to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = now
+            if len(self._slots) == self.max_calls:
+                slot = max(now, self._slots[0] + self.period)
+            self._slots.append(slot)
+            return slot - now
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+# Shared by every embeddings client in the process
+limiter = RateLimiter(int(os.getenv("GEMINI_EMBED_RPM", EMBED_RPM)))
+
+
+@lru_cache(maxsize=None)
+def _query_cache(model):
+    """Return the process-wide query embedding cache for the model, or None if disabled."""
+    path = os.getenv("EMBED_CACHE_PATH")
+    return EmbeddingCache(path, model) if path else None
+
+
+class ThrottledGoogleGenerativeAIEmbeddings(GoogleGenerativeAIEmbeddings):
+    """
+    `GoogleGenerativeAIEmbeddings` that sends documents in batches of `EMBED_BATCH_SIZE`
+    and waits on the shared `limiter` before each API request. Query embeddings are
+    served from the `EMBED_CACHE_PATH` cache when one is configured.
+
+    The async methods run the sync ones in an executor, so waiting for a slot never
+    blocks the event loop.
+    """
+
+    def embed_documents(self, texts, *args, **kwargs):
+        embeddings = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            limiter.acquire()
+            embeddings.extend(
+                super().embed_documents(
+                    texts[start : start + EMBED_BATCH_SIZE], *args, **kwargs
+                )
+            )
+        return embeddings
+
+    def embed_query(self, text, *args, **kwargs):
+        cache = _query_cache(self.model)
+        if cache is not None:
+            vector = cache.get(text)
+            if vector is not None:
+                return vector
+        limiter.acquire()
+        vector = super().embed_query(text, *args, **kwargs)
+        if cache is not None:
+            cache.put(text, vector)
+        return vector
+
+    async def aembed_documents(self, texts, *args, **kwargs):
+        return await run_in_executor(None, self.embed_documents, texts, *args, **kwargs)
+
+    async def aembed_query(self, text, *args, **kwargs):
+        return await run_in_executor(None, self.embed_query, text, *args, **kwargs)
@@ -3,9 +3,18 @@
 import asyncio
 import streamlit as st
 import pandas as pd
-from langchain_core.messages import HumanMessage
-from src.components import initialize_components
-from src.response_handler import generate_initial_response, trigger_fallback_logic
+from src.components import (
+    initialize_components,
+    get_response_cache,
+    get_sql_cache,
+    get_full_schema,
+)
+from src.response_handler import (
+    generate_initial_response,
+    trigger_fallback_logic,
+    needs_fallback,
+    build_human_message,
+)
 from src.data_handler import refine_response, get_data, data_handle
 
 async def main():
@@ -68,6 +77,8 @@ async def main():
         height=68,
         placeholder="Example: Provide me the names of the students that have paid their challan form and are in semester Fall 2025",
     )
+    # Collapse whitespace so resubmitted queries hit the exact-match caches
+    user_query = " ".join(user_query.split())
 
     # Generate SQL Query Button
     if st.button("Submit"):
@@ -78,8 +89,9 @@ async def main():
                     try:
                         # progress_bar = st.progress(st.session_state.progress)
                         # Step 1: Get initial response from LLM
-                        initial_response = generate_initial_response(
-                            user_query, llm, vector_store, k=5
+                        initial_response, context = await generate_initial_response(
+                            user_query, llm, vector_store, k=5,
+                            cache=get_sql_cache(), schema=get_full_schema(),
                         )
                         # st.write("Initial Response from LLM:")
                         # st.write(initial_response)
@@ -87,14 +99,10 @@ async def main():
                         # progress_bar.progress(st.session_state.progress) #update the progress bar
 
                         # Step 2: Check if initial response indicates fallback is needed
-                        if (
-                            """I cannot generate a SQL query
-                            for this request based on the provided schema."""
-                            in initial_response
-                        ):
+                        if needs_fallback(initial_response):
                             # st.write("Fallback response generated.")
-                            fallback_response = trigger_fallback_logic(
-                                user_query, llm, "", HumanMessage(content=user_query)
+                            fallback_response = await trigger_fallback_logic(
+                                user_query, llm, context, build_human_message(user_query)
                             )
                             # st.session_state.progress += 80 # Increase the progress by 10%
                             # progress_bar.progress(st.session_state.progress)
@@ -117,8 +125,12 @@ async def main():
 
                             # Step 5: Handle and summarize the data
                             if isinstance(data, pd.DataFrame) and not data.empty:
-                                summary_text, chart = data_handle(
-                                    data, user_query, llm, filename="data.json", rows=10
+                                _, summary_text, chart = await data_handle(
+                                    data,
+                                    user_query,
+                                    llm,
+                                    rows=10,
+                                    cache=get_response_cache(),
                                 )
                                 # st.write(data_rows)
                                 if summary_text:
@@ -0,0 +1,46 @@
+"""Tests for `build_chart` against the chart specs the data-summary prompts teach."""
+
+import orjson
+import pandas as pd
+import pytest
+
+from src.data_handler import CHART_SPEC_RE, build_chart
+from src.system_prompt import LARGE_DATA_SYSTEM_PROMPT, SHORT_DATA_SYSTEM_PROMPT
+
+EXAMPLE_SPECS = [
+    match.group(1)
+    for prompt in (SHORT_DATA_SYSTEM_PROMPT, LARGE_DATA_SYSTEM_PROMPT)
+    for match in CHART_SPEC_RE.finditer(prompt)
+]
+
+DATA = pd.DataFrame(
+    {"County": ["Kings", "Queens"], "White": [40.5, 25.0], "Unemployment": [11.2, 10.4]}
+)
+
+
+def bound_records(chart):
+    """Return the records bound to the chart, as plain dicts from its Vega-Lite spec."""
+    spec = chart.to_dict()  # validates the full spec against the Vega-Lite schema
+    data = spec["data"]
+    # Altair may move inline values into top-level "datasets", referenced by name
+    return data["values"] if "values" in data else spec["datasets"][data["name"]]
+
+
+def test_prompts_contain_example_specs():
+    assert EXAMPLE_SPECS
+
+
+@pytest.mark.parametrize("spec_text", EXAMPLE_SPECS)
+def test_prompt_example_specs_build(spec_text):
+    chart = build_chart(orjson.loads(spec_text), DATA)
+    assert bound_records(chart)[0]["County"] == "Kings"
+
+
+def test_llm_supplied_data_is_replaced():
+    spec = {
+        "data": {"url": "https://example.com/data.json"},
+        "mark": "bar",
+        "encoding": {"x": {"field": "County", "type": "nominal"}},
+    }
+    chart = build_chart(spec, DATA)
+    assert bound_records(chart) == DATA.to_dict(orient="records")